@@ -0,0 +1,207 @@
+"""Rendering throughput and scaling benchmarks.
+
+Every scene benchmark renders a simple scene (one microphone moving past the sources) while one parameter is swept
+around the base scene, and reports the wall time, the real-time factor (wall time / rendered duration) and the peak
+Python memory traced while rendering. Micro-benchmarks time the scalar and vectorized building blocks, and the import
+of the package in a fresh interpreter.
+
+usage::
+
+    python benchmarks/benchmark.py --output results.json
+    python benchmarks/benchmark.py --quick --compare results.json
+
+With ``--compare``, the exit status is 1 when a benchmark is slower than the baseline by more than ``--tolerance``.
+"""
+import os
+import sys
+import json
+import time
+import timeit
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+
+import numpy as np
+
+import dynamic_sound as ds
+from dynamic_sound.acoustics.standards.ISO_9613_1_1993 import attenuation_coefficients
+from dynamic_sound._emission import EmissionSolver
+
+BASE_SCENE = {
+    "duration": 1.0,  # [s]
+    "sample_rate": 8_000,  # [Hz]
+    "microphone": "Microphone",
+    "num_sources": 1,
+    "num_waypoints": 2,
+}
+
+SWEEPS = {
+    "duration": [0.5, 1.0, 2.0, 4.0],
+    "sample_rate": [4_000, 8_000, 16_000, 48_000],
+    "microphone": ["Microphone", "Hedraphone_v2"],
+    "num_sources": [1, 2, 4, 8],
+    "num_waypoints": [2, 16, 256, 4_096],
+}
+
+QUICK_SWEEPS = {
+    "duration": [0.5, 1.0],
+    "sample_rate": [4_000, 8_000],
+    "microphone": ["Microphone", "Hedraphone_v2"],
+    "num_sources": [1, 2],
+    "num_waypoints": [2, 256],
+}
+
+
+def _path(num_waypoints, start_time, stop_time, start, stop):
+    times = np.linspace(start_time, stop_time, num_waypoints)
+    positions = start + np.outer((times - start_time) / (stop_time - start_time), np.subtract(stop, start))
+    # small wobble, so that intermediate waypoints are not collinear
+    positions[:, 2] += 0.1 * np.sin(2 * np.pi * times)
+    rotations = np.tile([1.0, 0.0, 0.0, 0.0], (num_waypoints, 1))
+    return ds.Path(np.column_stack([times, positions, rotations]))
+
+
+def build_scene(output_dir, engine="reference", duration=1.0, sample_rate=8_000, microphone="Microphone", num_sources=1, num_waypoints=2):
+    sim = ds.Simulation(temperature=20, pressure=1, relative_humidity=50, engine=engine)
+    file_path = os.path.join(output_dir, "benchmark.wav")
+    if microphone == "Hedraphone_v2":
+        mic = ds.microphones.Hedraphone_v2(file_path=file_path, sample_rate=sample_rate)
+    else:
+        mic = ds.microphones.Microphone(file_path=file_path, sample_rate=sample_rate)
+    sim.add_microphone(path=_path(num_waypoints, 0.0, duration, [-10.0, 0.0, 1.0], [10.0, 0.0, 1.0]), microphone=mic)
+
+    # sources start well ahead of the microphone, so that their sound arrives from the first sample
+    for index in range(num_sources):
+        angle = 2 * np.pi * index / num_sources
+        start = [20.0 * np.cos(angle), 20.0 * np.sin(angle), 0.0]
+        source_path = _path(num_waypoints, -1.0, duration, start, [-start[0], -start[1], 0.0])
+        sim.add_source(path=source_path, source=ds.sources.SineWave(frequency=100.0 * (index + 1)))
+    return sim
+
+
+def benchmark_scene(params, engine, repeat):
+    with tempfile.TemporaryDirectory() as output_dir:
+        times = []
+        for _ in range(repeat):
+            sim = build_scene(output_dir, engine, **params)
+            start = time.perf_counter()
+            sim.run(progress=False)
+            times.append(time.perf_counter() - start)
+
+        sim = build_scene(output_dir, engine, **params)
+        tracemalloc.start()
+        sim.run(progress=False)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    num_channels = sim._microphones[0][1].num_channels
+    wall_time = min(times)
+    return {
+        "wall_time": wall_time,
+        "real_time_factor": wall_time / params["duration"],
+        "samples_per_second": params["duration"] * params["sample_rate"] * num_channels / wall_time,
+        "peak_memory": peak_memory,
+    }
+
+
+def _time(statement, number, repeat):
+    return min(timeit.repeat(statement, number=number, repeat=repeat)) / number
+
+
+def import_time(repeat):
+    # a fresh interpreter for each measure, the package being cached in sys.modules afterwards
+    script = "import time; start = time.perf_counter(); import dynamic_sound; print(time.perf_counter() - start)"
+    times = [float(subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout) for _ in range(repeat)]
+    return {"wall_time": min(times), "items": 1, "items_per_second": 1.0 / min(times)}
+
+
+def micro_benchmarks(repeat):
+    rng = np.random.default_rng(0)
+    source_path = _path(64, 0.0, 10.0, [-50.0, 5.0, 0.0], [50.0, 5.0, 0.0])
+    times = np.sort(rng.uniform(1.0, 10.0, 4_096))
+    receivers = rng.uniform(-1.0, 1.0, (len(times), 3))
+    solver = EmissionSolver(source_path, ds.acoustics.standards.ISO_9613_1_1993.SOUND_SPEED)
+    source = ds.sources.WhiteNoise(duration=11.0, sample_rate=48_000)
+    frequencies = np.linspace(0.0, 24_000.0, 512)
+
+    benchmarks = {
+        "_compute_emission": (lambda: ds.Simulation._compute_emission(receivers[0], times[0], source_path), 100, 1),
+        "EmissionSolver.solve": (lambda: solver.solve(times, receivers), 5, len(times)),
+        "Path.get_position": (lambda: source_path.get_position(times[0]), 1_000, 1),
+        "Path.get_positions": (lambda: source_path.get_positions(times), 20, len(times)),
+        "Source.get_sample": (lambda: source.get_sample(times[0]), 10_000, 1),
+        "Source.get_samples": (lambda: source.get_samples(times), 200, len(times)),
+        "attenuation_coefficients": (lambda: attenuation_coefficients(frequencies, 293.15, 50, 101.325), 1_000, len(frequencies)),
+    }
+    results = {}
+    for name, (statement, number, items) in benchmarks.items():
+        seconds = _time(statement, number, repeat)
+        results[name] = {"wall_time": seconds, "items": items, "items_per_second": items / seconds}
+    results["import dynamic_sound"] = import_time(repeat)
+    return results
+
+
+def run(quick=False, engine="reference", repeat=3):
+    sweeps = QUICK_SWEEPS if quick else SWEEPS
+    results = {
+        "meta": {
+            "dynamic_sound": ds.__version__,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "engine": engine,
+            "quick": quick,
+        },
+        "scenes": {},
+        "micro": micro_benchmarks(repeat),
+    }
+    for parameter, values in sweeps.items():
+        for value in values:
+            params = dict(BASE_SCENE, **{parameter: value})
+            results["scenes"][f"{parameter}={value}"] = dict(params=params, **benchmark_scene(params, engine, repeat))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """return the benchmarks slower than the baseline by more than ``tolerance`` (relative)."""
+    regressions = []
+    for group in ("scenes", "micro"):
+        for name, result in results[group].items():
+            reference = baseline.get(group, {}).get(name)
+            if reference is not None and result["wall_time"] > reference["wall_time"] * (1.0 + tolerance):
+                regressions.append((f"{group}/{name}", reference["wall_time"], result["wall_time"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="dynamic-sound benchmarks")
+    parser.add_argument("--quick", action="store_true", help="shorter sweeps")
+    parser.add_argument("--engine", default="reference", choices=list(ds._engines.ENGINES))
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions, the best one is reported")
+    parser.add_argument("--output", help="JSON file where the results are written")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    results = run(quick=args.quick, engine=args.engine, repeat=args.repeat)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for name, reference, current in regressions:
+            print(f"regression {name}: {reference:.3g} s -> {current:.3g} s", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
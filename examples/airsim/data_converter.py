@@ -37,6 +37,7 @@ def data_converter(data_dir):
             qw, qx, qy, qz,
         ])
     np.savetxt(os.path.join(dst_folder, "drone_path.csv"), data, delimiter=",")
+    np.save(os.path.join(dst_folder, "drone_path.npy"), np.array(data, dtype=np.float64))  # binary copy, fast to load with Path(file=...)
 
     # rotor profile
     data = []
@@ -62,6 +63,7 @@ def data_converter(data_dir):
             qw, qx, qy, qz
         ])
     np.savetxt(os.path.join(dst_folder, "camera_path.csv"), data, delimiter=",")
+    np.save(os.path.join(dst_folder, "camera_path.npy"), np.array(data, dtype=np.float64))  # binary copy, fast to load with Path(file=...)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,17 @@
-from ._version import __version__
-
 from . import acoustics
 from . import microphones
+from . import outputs
 from . import sources
 from .environment import Path
 from ._simulation import Simulation
+from ._profile import Profile
+from ._stream import BlockStream
+from ._batch import run_batch, read_manifest, scene_seed
+
+
+def __getattr__(name):
+    # the version is read from the package metadata only when requested, importlib.metadata is slow to import
+    if name == "__version__":
+        from ._version import __version__
+        return __version__
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import zlib
+import random
+import traceback
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from .sources import signal_cache
+from ._profile import TqdmProgress, progress_callback
+
+MANIFEST = "manifest.jsonl"
+
+# scene builder and shared sources of the worker process, set once by the pool initializer
+_build = None
+_sources = None
+
+
+def _init_worker(build, sources, signal_cache_dir=None):
+    global _build, _sources
+    _build = build
+    _sources = sources
+    if signal_cache_dir is not None:
+        signal_cache.cache_dir = signal_cache_dir
+
+
+def scene_seed(name, seed=0):
+    """return the seed of a scene, which only depends on the batch seed and on the scene name."""
+    return int(np.random.SeedSequence([seed, zlib.crc32(name.encode())]).generate_state(1)[0])
+
+
+def _run_scene(name, params, scene_seed, output_dir):
+    # the legacy global generators are seeded too, since microphones and sources may rely on them, and restored
+    # afterwards for the serial batches running in the caller's process
+    states = random.getstate(), np.random.get_state()
+    random.seed(scene_seed)
+    np.random.seed(scene_seed)
+    rng = np.random.default_rng(scene_seed)
+
+    entry = {"name": name, "seed": scene_seed, "params": params}
+    start = time.perf_counter()
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        simulation = _build(params, rng=rng, sources=_sources, output_dir=output_dir)
+        simulation.run(progress=False)
+        entry["outputs"] = [microphone.file_path for _, microphone in simulation._microphones]
+        entry["status"] = "done"
+    except Exception:
+        entry["status"] = "failed"
+        entry["error"] = traceback.format_exc()
+    finally:
+        random.setstate(states[0])
+        np.random.set_state(states[1])
+    entry["elapsed"] = time.perf_counter() - start
+    return entry
+
+
+def read_manifest(output_dir, manifest=MANIFEST):
+    """return the manifest entries of a batch, the last entry of each scene wins."""
+    entries = {}
+    manifest_path = os.path.join(output_dir, manifest)
+    if os.path.isfile(manifest_path):
+        with open(manifest_path) as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    entries[entry["name"]] = entry
+    return entries
+
+
+def run_batch(scenes, build, output_dir, workers=1, sources=None, seed=0, manifest=MANIFEST, signal_cache_dir=None, progress=True):
+    """render a batch of scenes over a pool of processes.
+
+    Each scene is a dictionary of JSON-serializable parameters, with an optional ``"name"`` (the scene index
+    otherwise) and an optional ``"seed"``. The scene is built in a worker by calling
+    ``build(params, rng=rng, sources=sources, output_dir=scene_dir)``, which must return the :class:`Simulation` to run
+    and write its microphones inside ``scene_dir``. ``build`` must be a module-level function.
+
+    Every finished scene is appended to the manifest in ``output_dir``, with its seed, parameters, output files and
+    status: scenes already marked as done are skipped, so an interrupted batch is resumed by running it again.
+
+    :param scenes: list or generator of scene parameters.
+    :type scenes: iterable
+    :param build: function building the simulation of a scene.
+    :type build: callable
+    :param output_dir: root directory of the batch.
+    :type output_dir: str
+    :param workers: number of processes.
+    :type workers: int
+    :param sources: read-only objects (e.g. decoded :class:`AudioFile` sources) loaded once and shared by all the
+        scenes. Workers are forked when the platform allows it, so that their buffers are not copied.
+    :type sources: dict
+    :param seed: seed of the batch, from which the seed of each scene is derived.
+    :type seed: int
+    :param manifest: name of the manifest file.
+    :type manifest: str
+    :param signal_cache_dir: optional directory where the signals decoded by :class:`AudioFile` are stored, so that
+        each audio file is decoded and resampled once for all the workers (see :class:`SignalCache`).
+    :type signal_cache_dir: str
+    :param progress: True for a tqdm bar of the scenes, False or None for no progress reporting, or a callable
+        ``progress(entry, done, total)`` called with the manifest entry of each finished scene, ``total`` being None
+        when ``scenes`` has no length.
+    :return: the manifest entries of the scenes rendered by this call.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    done = {name for name, entry in read_manifest(output_dir, manifest).items() if entry["status"] == "done"}
+
+    def tasks():
+        for index, params in enumerate(scenes):
+            name = str(params.get("name", f"scene_{index:06d}"))
+            if name not in done:
+                yield name, params, params.get("seed", scene_seed(name, seed)), os.path.join(output_dir, name)
+
+    total = sum(1 for _ in tasks()) if hasattr(scenes, "__len__") else None
+    progress = progress_callback(progress, desc="scenes")
+    entries = []
+    with open(os.path.join(output_dir, manifest), "a") as manifest_file:
+        def record(entry):
+            manifest_file.write(json.dumps(entry) + "\n")
+            manifest_file.flush()
+            entries.append(entry)
+            if progress is not None:
+                progress(entry, len(entries), total)
+
+        try:
+            if workers <= 1:
+                # the caller process is the worker, its signal cache is restored afterwards
+                cache_dir = signal_cache.cache_dir
+                _init_worker(build, sources, signal_cache_dir)
+                try:
+                    for task in tasks():
+                        record(_run_scene(*task))
+                finally:
+                    signal_cache.cache_dir = cache_dir
+                return entries
+
+            context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(build, sources, signal_cache_dir)) as pool:
+                # scenes are submitted lazily, so that generators of any length can be used
+                pending = set()
+                for task in tasks():
+                    pending.add(pool.submit(_run_scene, *task))
+                    if len(pending) >= 2 * workers:
+                        finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in finished:
+                            record(future.result())
+                for future in pending:
+                    record(future.result())
+        finally:
+            if isinstance(progress, TqdmProgress):
+                progress.close()
+    return entries
@@ -0,0 +1,237 @@
+import numpy as np
+
+from .acoustics.standards.ISO_9613_1_1993 import SOUND_SPEED
+
+
+def _take(c, indices):
+    # speed of sound of the selected samples, when it is given per sample
+    return c if c is None or np.ndim(c) == 0 else c[indices]
+
+
+class EmissionSolver:
+    """Batched retarded-time solver for a source moving along a piecewise linear path.
+
+    The per-segment velocity and the quadratic coefficient that does not depend on the receiver are computed once,
+    so that an entire block of receiver samples is solved with one vectorized pass per segment.
+
+    :param path: path followed by the source.
+    :type path: Path
+    :param c: speed of sound [m/s].
+    :type c: float
+    """
+
+    def __init__(self, path, c=SOUND_SPEED):
+        positions = np.asarray(path.positions, dtype=np.float64)
+        self.c = c
+        self.t0 = positions[:-1, 0].copy()
+        self.t1 = positions[1:, 0].copy()
+        self.p0 = positions[:-1, 1:4].copy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.v = (positions[1:, 1:4] - self.p0) / (self.t1 - self.t0)[:, None]
+        self.vv = self.v[:, 0]**2 + self.v[:, 1]**2 + self.v[:, 2]**2
+        self.A = self.vv - c**2
+        self.num_segments = len(self.t0)
+
+    def solve(self, times, positions, c=None):
+        """return the emission times and positions of the sound reaching the receiver.
+
+        :param times: receiver times, shape (N,).
+        :type times: np.ndarray
+        :param positions: receiver positions, shape (N, 3).
+        :type positions: np.ndarray
+        :param c: speed of sound [m/s], a scalar or one value per receiver sample, the one of the solver by default.
+        :type c: float or np.ndarray
+        :return: emission times (N,) and emission positions (N, 3), NaN where no sound has arrived yet.
+        """
+        times = np.asarray(times, dtype=np.float64)
+        positions = np.asarray(positions, dtype=np.float64)
+        time_emission = np.full(len(times), np.nan)
+        segment = np.full(len(times), -1, dtype=np.intp)
+
+        pending = np.flatnonzero(~np.isnan(times) & ~np.isnan(positions).any(axis=1))
+        if len(pending) > 0:
+            last = np.searchsorted(self.t0, times[pending].max(), side="right")
+            self._solve_segments(times, positions, pending, range(last), time_emission, segment, c)
+
+        return time_emission, self._positions(time_emission, segment)
+
+    def _solve_segments(self, times, positions, pending, segments, time_emission, segment, c=None):
+        # the first segment (in path order) providing a valid root wins, as in Simulation._compute_emission
+        for path_index in segments:
+            if len(pending) == 0:
+                break
+            t0 = self.t0[path_index]
+            active = pending[times[pending] >= t0]
+            if len(active) == 0:
+                continue
+
+            found = self._solve_segment(path_index, times[active], positions[active], _take(c, active))
+            resolved = active[~np.isnan(found)]
+            time_emission[resolved] = found[~np.isnan(found)]
+            segment[resolved] = path_index
+            pending = np.setdiff1d(pending, resolved, assume_unique=True)
+        return pending
+
+    def _solve_segment(self, path_index, time_receiver, position_receiver, c=None):
+        if c is None:
+            c = self.c
+            A = self.A[path_index]
+        else:
+            A = self.vv[path_index] - c**2
+        t0 = self.t0[path_index]
+        t1 = self.t1[path_index]
+        v = self.v[path_index]
+
+        d0 = position_receiver - self.p0[path_index]
+        dt = time_receiver - t0
+        B = 2 * (c**2 * dt - (d0[:, 0] * v[0] + d0[:, 1] * v[1] + d0[:, 2] * v[2]))
+        C = d0[:, 0]**2 + d0[:, 1]**2 + d0[:, 2]**2 - (c * dt)**2
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if np.ndim(A) == 0 and A == 0:
+                time_emission = np.where(B != 0, -C / B, np.nan) + t0
+            else:
+                delta = B**2 - 4*A*C
+                sqrt_delta = np.sqrt(np.where(delta > 0, delta, np.nan))
+                time_emission = np.minimum((-B - sqrt_delta) / (2*A) + t0, (-B + sqrt_delta) / (2*A) + t0)
+                if np.ndim(A) > 0:
+                    time_emission = np.where(A == 0, np.where(B != 0, -C / B, np.nan) + t0, time_emission)
+
+            valid = (t0 <= time_emission) & (time_emission < t1) & (time_emission <= time_receiver)
+        return np.where(valid, time_emission, np.nan)
+
+    def _arrived(self, path_index, time_receiver, position_receiver, c=None):
+        # True where the sound emitted at the start of the segment has already reached the receiver
+        c = self.c if c is None else c
+        d0 = position_receiver - self.p0[path_index]
+        return c * (time_receiver - self.t0[path_index]) >= np.sqrt(d0[:, 0]**2 + d0[:, 1]**2 + d0[:, 2]**2)
+
+    def _positions(self, time_emission, segment):
+        position_emission = np.full((len(time_emission), 3), np.nan)
+        found = segment >= 0
+        index = segment[found]
+        position_emission[found] = self.p0[index] + self.v[index] * (time_emission[found] - self.t0[index])[:, None]
+        return position_emission
+
+
+class EmissionTracker:
+    """Stateful emission solver for a single (source, microphone channel) pair.
+
+    Receiver time only moves forward and, for a source slower than sound, so does the emission time.
+    The tracker therefore resumes the segment scan from the segment found for the previous block and stops as soon as
+    the remaining samples cannot be reached by later segments. Samples left unresolved are searched again over the
+    segments preceding the cursor, so that an invalid cursor only costs a full search. A new (or reset) tracker places
+    its cursor by bisection on the first receiver sample, so that starting in the middle of a long path costs
+    O(log N) segments.
+
+    :param solver: solver of the source path.
+    :type solver: EmissionSolver
+    """
+
+    def __init__(self, solver):
+        self.solver = solver
+        self.segment = None
+
+    def reset(self):
+        self.segment = None
+
+    def _seed(self, time_receiver, position_receiver, c=None):
+        # last segment whose beginning has been heard by the receiver, the arrival of the beginning of the segments
+        # being monotone for a source slower than sound
+        solver = self.solver
+        low, high = 0, int(np.searchsorted(solver.t0, time_receiver, side="right"))
+        while high - low > 1:
+            middle = (low + high) // 2
+            if solver._arrived(middle, np.array([time_receiver]), position_receiver[None], c)[0]:
+                low = middle
+            else:
+                high = middle
+        return low
+
+    def solve(self, times, positions, c=None, return_segments=False):
+        """same as :meth:`EmissionSolver.solve`, but amortized O(1) segments per sample.
+
+        :param return_segments: also return the path segment of each emission, -1 where no sound has arrived yet.
+        :type return_segments: bool
+        """
+        solver = self.solver
+        times = np.asarray(times, dtype=np.float64)
+        positions = np.asarray(positions, dtype=np.float64)
+        time_emission = np.full(len(times), np.nan)
+        segment = np.full(len(times), -1, dtype=np.intp)
+
+        pending = np.flatnonzero(~np.isnan(times) & ~np.isnan(positions).any(axis=1))
+        if self.segment is None:
+            # cold tracker, seeded once a sample can be solved
+            if len(pending) > 0:
+                first = pending[np.argmin(times[pending])]
+                self.segment = self._seed(times[first], positions[first], _take(c, first))
+        elif not 0 <= self.segment < solver.num_segments:
+            self.segment = 0
+        for path_index in range(self.segment or 0, solver.num_segments):
+            if len(pending) == 0 or times[pending].max() < solver.t0[path_index]:
+                break
+            # the emission time grows with the segment index: nothing left to find once no sample has heard the
+            # beginning of the segment
+            if not solver._arrived(path_index, times[pending], positions[pending], _take(c, pending)).any():
+                break
+
+            found = solver._solve_segment(path_index, times[pending], positions[pending], _take(c, pending))
+            solved = ~np.isnan(found)
+            time_emission[pending[solved]] = found[solved]
+            segment[pending[solved]] = path_index
+            pending = pending[~solved]
+
+        # fallback: full search of the segments preceding the cursor
+        if len(pending) > 0 and self.segment:
+            solver._solve_segments(times, positions, pending, range(self.segment), time_emission, segment, c)
+
+        if (segment >= 0).any():
+            self.segment = int(segment.max())
+        if return_segments:
+            return time_emission, solver._positions(time_emission, segment), segment
+        return time_emission, solver._positions(time_emission, segment)
+
+
+def far_field(solver, times, positions, time_emission, segment, offsets, c=None):
+    """return the emission times and distances of receivers close to a reference point, expanded to the first order
+    around the emission solved at the reference point, with an estimate of the error of the emission times.
+
+    With ``u`` the direction of propagation and ``v`` the source velocity, a receiver moved by ``o`` hears the source
+    ``u . o / (c - u . v)`` seconds earlier in emission time. The neglected second-order term comes from the curvature
+    of the wavefront, ``(|o|^2 - (u . o)^2) / (2 d (c - u . v))`` seconds at distance ``d``.
+
+    :param solver: solver of the source path.
+    :type solver: EmissionSolver
+    :param times: receiver times, shape (N,).
+    :type times: np.ndarray
+    :param positions: reference point positions, shape (N, 3).
+    :type positions: np.ndarray
+    :param time_emission: emission times solved at the reference point, shape (N,).
+    :type time_emission: np.ndarray
+    :param segment: path segments of these emissions, see :meth:`EmissionTracker.solve`.
+    :type segment: np.ndarray
+    :param offsets: receiver positions relative to the reference point, shape (N, 3) or (M, N, 3) for M receivers.
+    :type offsets: np.ndarray
+    :param c: speed of sound [m/s], a scalar or one value per receiver sample, the one of the solver by default.
+    :type c: float or np.ndarray
+    :return: emission times, distances and error estimates [s], shape (N,) or (M, N), the error is infinite where the
+        expansion does not apply (no sound at the reference point, or emission outside of its path segment).
+    """
+    c = solver.c if c is None else c
+    found = segment >= 0
+    index = np.where(found, segment, 0)
+    v = solver.v[index]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        direction = positions - (solver.p0[index] + v * (time_emission - solver.t0[index])[:, None])
+        distance = np.sqrt(direction[:, 0]**2 + direction[:, 1]**2 + direction[:, 2]**2)
+        direction /= distance[:, None]
+        closing = c - (direction[:, 0] * v[:, 0] + direction[:, 1] * v[:, 1] + direction[:, 2] * v[:, 2])
+        projection = np.einsum("...j,...j->...", offsets, direction)
+        shift = projection / closing
+        error = (np.einsum("...j,...j->...", offsets, offsets) - projection**2) / (2 * distance * closing)
+
+        time_emission = time_emission - shift
+        applies = found & (solver.t0[index] <= time_emission) & (time_emission < solver.t1[index]) & (time_emission <= times) & (distance > 0)
+    return np.where(applies, time_emission, np.nan), distance + c * shift, np.where(applies, error, np.inf)
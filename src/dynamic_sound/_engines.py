@@ -0,0 +1,202 @@
+import numpy as np
+
+from .acoustics.absorption import BlockFilter
+from ._kernels import NUMBA_AVAILABLE, compiled_fir_accumulate, fir_accumulate
+
+
+def _fir_kernel():
+    # FIR accumulation of a block: compiled when numba is installed, vectorized with NumPy otherwise
+    return compiled_fir_accumulate() if NUMBA_AVAILABLE else fir_accumulate
+
+
+class _SampleEngine:
+    """Base of the per-sample engines, filtering with the grid filters of a :class:`FilterBank`."""
+    latency = 0
+    alignment = 1
+
+    def __init__(self, bank, num_sources):
+        self.bank = bank
+        self.num_sources = num_sources
+        self.warmup = bank.filter_len
+        self._pushes = 0
+
+    @property
+    def settled(self):
+        return self._pushes >= self.bank.filter_len
+
+    def set_bank(self, bank):
+        """filter the next samples with the filters of another bank (e.g. for a new air state)."""
+        self.bank = bank
+
+
+class ReferenceEngine(_SampleEngine):
+    """Per-sample air absorption: every received sample is filtered with the FIR designed for its own distance.
+
+    All the sources of a channel share the same filter history, as in the original renderer. The history only depends
+    on the rendered samples once ``filter_len`` samples have been pushed (:attr:`settled`).
+
+    :param bank: filter bank providing the absorption filters.
+    :type bank: FilterBank
+    :param num_sources: number of sources mixed in the channel.
+    :type num_sources: int
+    """
+
+    def __init__(self, bank, num_sources):
+        super().__init__(bank, num_sources)
+        # filter history, newest sample first: the window is self._history[self._head:self._head + filter_len]
+        self._history = np.zeros(8 * bank.filter_len)
+        self._head = len(self._history) - bank.filter_len
+
+    def _push(self, sample):
+        if self._head == 0:
+            filter_len = self.bank.filter_len
+            self._head = len(self._history) - filter_len
+            self._history[self._head:] = self._history[:filter_len].copy()
+        self._head -= 1
+        self._history[self._head] = sample
+        self._pushes += 1
+
+    def process(self, samples, distances):
+        """filter and mix the contributions of all the sources to a block of a channel.
+
+        :param samples: source samples scaled by the geometric attenuation, shape (num_sources, N).
+        :type samples: np.ndarray
+        :param distances: source distances, NaN where no sound is received, shape (num_sources, N).
+        :type distances: np.ndarray
+        :return: the N output samples.
+        """
+        filter_len = self.bank.filter_len
+        out_samples = np.zeros(samples.shape[1])
+        for sample_index in range(samples.shape[1]):
+            for source_index in range(self.num_sources):
+                distance = distances[source_index, sample_index]
+                if not np.isnan(distance):
+                    self._push(samples[source_index, sample_index])
+                    air_fir_coefficients = self.bank.filter(distance)
+                    out_samples[sample_index] += air_fir_coefficients.dot(self._history[self._head:self._head + filter_len])
+        return out_samples
+
+
+class JitEngine(_SampleEngine):
+    """Same filtering as :class:`ReferenceEngine`, with the per-sample FIR accumulation of a whole block run by a
+    compiled kernel when numba is installed (``pip install dynamic-sound[jit]``), by a vectorized NumPy kernel
+    otherwise. Results are equal to the reference ones up to the rounding of the dot products.
+
+    :param bank: filter bank providing the absorption filters.
+    :type bank: FilterBank
+    :param num_sources: number of sources mixed in the channel.
+    :type num_sources: int
+    """
+
+    def __init__(self, bank, num_sources):
+        super().__init__(bank, num_sources)
+        # last filter_len - 1 pushed samples, oldest first
+        self._history = np.zeros(bank.filter_len - 1)
+        self._kernel = _fir_kernel()
+
+    def process(self, samples, distances):
+        out_samples = np.zeros(samples.shape[1])
+        # samples are pushed in time order, and in source order within the same time instant
+        valid = ~np.isnan(distances.T)
+        targets, _ = np.nonzero(valid)
+        if len(targets) == 0:
+            return out_samples
+        stream = np.concatenate([self._history, samples.T[valid]])
+        filters, lower, upper, alphas = self.bank.grid_filters(distances.T[valid])
+        self._kernel(stream, filters, lower, upper, alphas, targets, out_samples)
+        self._history = stream[len(stream) - len(self._history):]
+        self._pushes += len(targets)
+        return out_samples
+
+
+class FftEngine:
+    """Block air absorption: every source is filtered independently with FFT overlap-add, see :class:`BlockFilter`.
+
+    The output only depends on the rendered samples once ``block_size + filter_len - 1`` samples have been returned,
+    provided that the rendering started at a multiple of ``hop``.
+
+    :param bank: filter bank providing the absorption filters.
+    :type bank: FilterBank
+    :param num_sources: number of sources mixed in the channel.
+    :type num_sources: int
+    :param block_size: number of samples of each FFT frame.
+    :type block_size: int
+    :param hop: number of samples between consecutive frames.
+    :type hop: int
+    """
+
+    def __init__(self, bank, num_sources, block_size=2_048, hop=512):
+        self.filters = [BlockFilter(bank, block_size=block_size, hop=hop) for _ in range(max(num_sources, 1))]
+        self.latency = self.filters[0].latency
+        self.alignment = hop
+        self.warmup = block_size + bank.filter_len - 1
+
+    @property
+    def settled(self):
+        return self.filters[0]._returned >= self.warmup
+
+    def set_bank(self, bank):
+        for block_filter in self.filters:
+            block_filter.bank = bank
+
+    def process(self, samples, distances):
+        if len(samples) == 0:
+            # without sources the first filter runs on silence, to keep the output length consistent
+            samples = np.zeros((1, samples.shape[1]))
+            distances = np.full((1, samples.shape[1]), np.nan)
+        return sum(block_filter.process(source_samples, source_distances) for block_filter, source_samples, source_distances in zip(self.filters, samples, distances))
+
+
+class DelayLineEngine(_SampleEngine):
+    """Per-sample air absorption with a delay line per source: unlike :class:`ReferenceEngine`, every source of the
+    channel is filtered with its own history before the sources are mixed, so that their contributions are not
+    interleaved in a shared history. The cost grows linearly with the number of sources.
+
+    Every output sample pushes one sample per source, silence where no sound of the source is received: the filter of
+    the last received distance is kept while the history of the source rings out. The FIR accumulation runs in the
+    kernel of :class:`JitEngine`.
+
+    :param bank: filter bank providing the absorption filters.
+    :type bank: FilterBank
+    :param num_sources: number of sources mixed in the channel.
+    :type num_sources: int
+    """
+
+    def __init__(self, bank, num_sources):
+        super().__init__(bank, num_sources)
+        # last filter_len - 1 samples of each source, oldest first, and last received distance of each source
+        self._history = np.zeros((num_sources, bank.filter_len - 1))
+        self._distances = np.full(num_sources, np.nan)
+        self._kernel = _fir_kernel()
+
+    def process(self, samples, distances):
+        num_samples = samples.shape[1]
+        out_samples = np.zeros(num_samples)
+        for source_index in range(self.num_sources):
+            received = ~np.isnan(distances[source_index])
+            stream = np.concatenate([self._history[source_index], np.where(received, samples[source_index], 0.0)])
+            self._history[source_index] = stream[num_samples:]
+
+            # distance of the last received sample, carried over the samples where nothing is received
+            last = np.maximum.accumulate(np.where(received, np.arange(num_samples), -1))
+            source_distances = np.where(last >= 0, distances[source_index, np.maximum(last, 0)], self._distances[source_index])
+            if received.any():
+                self._distances[source_index] = distances[source_index, last[-1]]
+            filtered = ~np.isnan(source_distances)
+            if not filtered.any() or not stream.any():
+                continue
+
+            targets = np.flatnonzero(filtered)
+            filters, lower, upper, alphas = self.bank.grid_filters(source_distances[targets])
+            # nothing is filtered before the first received sample only, the filtered samples are contiguous
+            self._kernel(stream[targets[0]:], filters, lower, upper, alphas, targets, out_samples)
+        self._pushes += num_samples
+        return out_samples
+
+
+ENGINES = {
+    "reference": ReferenceEngine,
+    "fft": FftEngine,
+    "jit": JitEngine,
+    "delay": DelayLineEngine,
+}
@@ -0,0 +1,21 @@
+import os
+
+
+def _atomic_save(path, writer):
+    """write a file under a temporary name and rename it, so that concurrent processes never read a partial file.
+
+    :param path: destination file, its directory is created if needed.
+    :type path: str
+    :param writer: function writing the file at the temporary path it is given, which keeps the extension of ``path``.
+    :type writer: callable
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    root, extension = os.path.splitext(path)
+    tmp_file = f"{root}.{os.getpid()}.tmp{extension}"
+    try:
+        writer(tmp_file)
+        os.replace(tmp_file, path)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
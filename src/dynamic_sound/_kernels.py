@@ -0,0 +1,61 @@
+import importlib.util
+
+import numpy as np
+
+# numba is only imported when a kernel is compiled
+NUMBA_AVAILABLE = importlib.util.find_spec("numba") is not None
+
+PUSH_BLOCK = 2_048  # pushes filtered at once by the NumPy kernel, bounds its (pushes, filter_len) temporaries
+
+_compiled = None
+
+
+def fir_accumulate_loop(stream, filters, lower, upper, alphas, targets, out):
+    """sample by sample time-varying FIR, see :func:`compiled_fir_accumulate`.
+
+    :param stream: pushed samples, oldest first, preceded by the ``filter_len - 1`` samples of the history.
+    :type stream: np.ndarray
+    :param filters: grid filters used by the block, shape (K, filter_len).
+    :type filters: np.ndarray
+    :param lower: row of ``filters`` below the distance of each push.
+    :type lower: np.ndarray
+    :param upper: row of ``filters`` above the distance of each push.
+    :type upper: np.ndarray
+    :param alphas: interpolation weight of the upper filter of each push.
+    :type alphas: np.ndarray
+    :param targets: output sample of each push.
+    :type targets: np.ndarray
+    :param out: output samples, accumulated in place.
+    :type out: np.ndarray
+    """
+    filter_len = filters.shape[1]
+    for push in range(len(targets)):
+        alpha = alphas[push]
+        accumulator = 0.0
+        for tap in range(filter_len):
+            coefficient = (1.0 - alpha) * filters[lower[push], tap] + alpha * filters[upper[push], tap]
+            accumulator += coefficient * stream[push + filter_len - 1 - tap]
+        out[targets[push]] += accumulator
+
+
+def compiled_fir_accumulate():
+    """return :func:`fir_accumulate_loop` compiled with numba, which is imported and compiles it on first use."""
+    global _compiled
+    if _compiled is None:
+        from numba import njit
+
+        _compiled = njit(cache=True)(fir_accumulate_loop)
+    return _compiled
+
+
+def fir_accumulate(stream, filters, lower, upper, alphas, targets, out):
+    """vectorized NumPy version of :func:`fir_accumulate_loop`, with the same arguments."""
+    filter_len = filters.shape[1]
+    reversed_filters = filters[:, ::-1]
+    windows = np.lib.stride_tricks.sliding_window_view(stream, filter_len)
+    for start in range(0, len(targets), PUSH_BLOCK):
+        stop = min(start + PUSH_BLOCK, len(targets))
+        alpha = alphas[start:stop, None]
+        coefficients = (1.0 - alpha) * reversed_filters[lower[start:stop]] + alpha * reversed_filters[upper[start:stop]]
+        values = np.einsum("ij,ij->i", coefficients, windows[start:stop])
+        out += np.bincount(targets[start:stop], weights=values, minlength=len(out))
@@ -0,0 +1,117 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .outputs import BackgroundWriter, open_sink
+from ._profile import NO_PROFILE, Profile, ProfiledSink, tracing
+from ._renderer import Renderer
+
+PARTITIONS = ("microphone", "channel", "time")
+SEGMENT_CHUNKS = 16  # chunks rendered by each "time" task
+
+# simulation of the worker process, set once by the pool initializer
+_simulation = None
+_solvers = None
+_profile = False
+
+
+def _init_worker(simulation, profile=False):
+    global _simulation, _solvers, _profile
+    _simulation = simulation
+    _solvers = simulation._solvers()
+    _profile = profile
+
+
+def _task_profile():
+    # each task returns its own profile, merged by the main process
+    return Profile(memory=_profile.memory) if _profile else NO_PROFILE
+
+
+def _render_microphone(microphone_index):
+    microphone_path, microphone = _simulation._microphones[microphone_index]
+    profile = _task_profile()
+    with tracing(profile):
+        _simulation._render_microphone(microphone_path, microphone, _solvers, profile=profile)
+    return profile if profile.enabled else None
+
+
+def _render_tile(microphone_index, channels, start, stop, save_filters):
+    microphone_path, microphone = _simulation._microphones[microphone_index]
+    profile = _task_profile()
+    with tracing(profile):
+        renderer = Renderer(_simulation, microphone_path, microphone, _solvers, channels=channels, profile=profile, save_filters=save_filters)
+        renderer.seek(start)
+        samples = np.concatenate(list(renderer.chunks(stop)))
+    return samples, profile if profile.enabled else None
+
+
+def _tiles(simulation, partition, workers, microphone, num_samples):
+    # list of time ranges, each one split in tiles of channels
+    segment_size = SEGMENT_CHUNKS * simulation.chunk_size
+    if partition == "channel":
+        groups = [group.tolist() for group in np.array_split(np.arange(microphone.num_channels), min(workers, microphone.num_channels))]
+    else:
+        groups = [None]
+        if num_samples < workers * segment_size:
+            segment_size = max(1, -(-num_samples // workers))
+    return [(start, min(start + segment_size, num_samples), groups) for start in range(0, num_samples, segment_size)]
+
+
+def run_parallel(simulation, workers, partition="time", profile=NO_PROFILE, progress=None):
+    """render the simulation over a pool of ``workers`` processes.
+
+    Every task renders a tile (range of samples and group of channels) of a microphone after rebuilding the renderer
+    state at its first sample, see :meth:`Renderer.seek`: tiles are therefore identical to the corresponding part of the
+    serial render and are written in order by the main process. The profiles of the tasks are merged into ``profile``,
+    the warm-up of the tiles included.
+    """
+    if partition not in PARTITIONS:
+        raise ValueError(f"unknown partition '{partition}', available partitions: {', '.join(PARTITIONS)}")
+
+    def merge(task_profile):
+        if task_profile is not None:
+            profile.merge(task_profile)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(simulation, profile if profile.enabled else False)) as pool:
+        if partition == "microphone":
+            futures = [pool.submit(_render_microphone, index) for index in range(len(simulation._microphones))]
+            for future, (microphone_path, microphone) in zip(futures, simulation._microphones):
+                merge(future.result())
+                if progress is not None:
+                    num_samples = int(microphone.sample_rate * microphone_path.duration)
+                    progress(microphone, num_samples, num_samples)
+            return
+
+        for microphone_index, (microphone_path, microphone) in enumerate(simulation._microphones):
+            num_samples = int(microphone.sample_rate * microphone_path.duration)
+            ranges = iter(_tiles(simulation, partition, workers, microphone, num_samples))
+            pending = deque()
+
+            def submit():
+                time_range = next(ranges, None)
+                if time_range is not None:
+                    start, stop, groups = time_range
+                    # the filter cache is written by a single tile, the one ending the first channel group
+                    pending.append((stop - start, [pool.submit(_render_tile, microphone_index, channels, start, stop, stop == num_samples and group_index == 0) for group_index, channels in enumerate(groups)]))
+
+            sink = open_sink(microphone, num_samples)
+            if profile.enabled:
+                sink = ProfiledSink(sink, profile)
+            with BackgroundWriter(sink) as writer:
+                # at most two ranges per worker are in flight, to bound the memory of the main process
+                for _ in range(2 * workers):
+                    submit()
+                done = 0
+                while pending:
+                    count, futures = pending.popleft()
+                    tiles = []
+                    for future in futures:
+                        samples, task_profile = future.result()
+                        tiles.append(samples)
+                        merge(task_profile)
+                    writer.write(np.concatenate(tiles, axis=1))
+                    done += count
+                    if progress is not None:
+                        progress(microphone, done, num_samples)
+                    submit()
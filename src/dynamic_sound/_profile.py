@@ -0,0 +1,143 @@
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+STAGES = ("prepare", "pose", "emission", "source", "fir_design", "filter", "output")
+
+
+class Profile:
+    """Wall time, number of calls and peak traced memory of the stages of a render, returned by
+    ``Simulation.run(profile=True)``.
+
+    Stages are "prepare" (conversion of the sampled sources to the microphone rate), "pose" (path interpolation and
+    microphone positions), "emission" (retarded time solve), "source" (source sampling and geometric attenuation),
+    "fir_design" (air absorption filters design), "filter" (absorption engines) and "output" (encoding and writing, on the writer thread). Peak memory is measured with
+    :mod:`tracemalloc` when ``memory`` is true, except for the "output" stage which runs concurrently with the others.
+
+    :param memory: whether the peak memory of each stage is measured.
+    :type memory: bool
+    """
+    enabled = True
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.stages = {}
+        self.wall_time = 0.0
+
+    @contextmanager
+    def stage(self, name, memory=True):
+        memory = memory and self.memory and tracemalloc.is_tracing()
+        if memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start, peak_memory=tracemalloc.get_traced_memory()[1] if memory else 0)
+
+    def add(self, name, seconds, calls=1, peak_memory=0):
+        stage = self.stages.setdefault(name, {"time": 0.0, "calls": 0, "peak_memory": 0})
+        stage["time"] += seconds
+        stage["calls"] += calls
+        stage["peak_memory"] = max(stage["peak_memory"], peak_memory)
+
+    def merge(self, other):
+        """add the stages of another profile, e.g. the one of a worker process."""
+        for name, stage in other.stages.items():
+            self.add(name, stage["time"], stage["calls"], stage["peak_memory"])
+
+    @property
+    def peak_memory(self):
+        return max((stage["peak_memory"] for stage in self.stages.values()), default=0)
+
+    def as_dict(self):
+        return {"wall_time": self.wall_time, "peak_memory": self.peak_memory, "stages": self.stages}
+
+    def __str__(self):
+        lines = [f"{'stage':<12}{'time [s]':>12}{'calls':>10}{'peak [MB]':>12}"]
+        names = [name for name in STAGES if name in self.stages] + [name for name in self.stages if name not in STAGES]
+        for name in names:
+            stage = self.stages[name]
+            lines.append(f"{name:<12}{stage['time']:>12.3f}{stage['calls']:>10d}{stage['peak_memory'] / 2**20:>12.1f}")
+        lines.append(f"{'total':<12}{self.wall_time:>12.3f}")
+        return "\n".join(lines)
+
+
+class _NoProfile:
+    # stand-in used when profiling is disabled, its stages cost a method call
+    enabled = False
+    _stage = nullcontext()
+
+    def stage(self, name, memory=True):
+        return self._stage
+
+    def add(self, name, seconds, calls=1, peak_memory=0):
+        pass
+
+
+NO_PROFILE = _NoProfile()
+
+
+@contextmanager
+def tracing(profile):
+    """trace the memory allocations while ``profile`` is enabled, unless they are already traced."""
+    start = profile.enabled and profile.memory and not tracemalloc.is_tracing()
+    if start:
+        tracemalloc.start()
+    try:
+        yield
+    finally:
+        if start:
+            tracemalloc.stop()
+
+
+class ProfiledSink:
+    """Sink wrapper adding the time spent in ``write`` to the "output" stage of a profile."""
+
+    def __init__(self, sink, profile):
+        self.sink = sink
+        self.profile = profile
+
+    def write(self, samples):
+        with self.profile.stage("output", memory=False):
+            self.sink.write(samples)
+
+    def close(self):
+        self.sink.close()
+
+
+class TqdmProgress:
+    """Progress callback showing a tqdm bar for each microphone being rendered, or a single bar named ``desc``."""
+
+    def __init__(self, desc=None):
+        self.desc = desc
+        self._bars = {}
+
+    def __call__(self, item, done, total):
+        key = id(item) if self.desc is None else self.desc
+        bar = self._bars.get(key)
+        if bar is None:
+            from tqdm import tqdm
+
+            bar = self._bars[key] = tqdm(total=total, desc=self.desc or os.path.basename(item.file_path))
+        bar.update(done - bar.n)
+        if total is not None and done >= total:
+            bar.close()
+            del self._bars[key]
+
+    def close(self):
+        """close the bars left open, whose total was unknown."""
+        for bar in self._bars.values():
+            bar.close()
+        self._bars.clear()
+
+
+def progress_callback(progress, desc=None):
+    """return the progress callback selected by ``Simulation.run(progress=...)``: a tqdm bar for True (a single one
+    named ``desc`` if given), None for False or None, the callable itself otherwise."""
+    if progress is True:
+        return TqdmProgress(desc)
+    if not progress:
+        return None
+    return progress
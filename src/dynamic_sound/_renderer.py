@@ -0,0 +1,194 @@
+import numpy as np
+
+from .acoustics import absorption, attenuations
+from .acoustics.standards.ISO_9613_1_1993 import sound_speed
+from .environment import Air
+from ._emission import EmissionTracker, _take, far_field
+from ._profile import NO_PROFILE
+
+
+def source_samples(source, times_emission, distances):
+    samples = np.zeros(len(times_emission))
+    valid = ~np.isnan(times_emission)
+    samples[valid] = source.get_samples(times_emission[valid])
+    samples[valid] *= attenuations.geometric(distances[valid])
+    return samples
+
+
+class Renderer:
+    """Render the output of a microphone sequentially, keeping the emission trackers and the absorption engines state
+    between consecutive calls of :meth:`render`.
+
+    :param simulation: simulation providing sources, air and engine settings.
+    :type simulation: Simulation
+    :param microphone_path: path of the microphone.
+    :type microphone_path: Path
+    :param microphone: rendered microphone.
+    :type microphone: MicrophoneArray
+    :param solvers: emission solvers of the simulation sources.
+    :type solvers: list
+    :param channels: indices of the rendered channels, all of them by default.
+    :type channels: list
+    :param profile: profile where the time of each stage is recorded.
+    :type profile: Profile
+    :param source_indices: indices of the rendered sources, all of them by default.
+    :type source_indices: list
+    :param save_filters: store the designed filters in the filter cache once the end of the render is reached.
+    :type save_filters: bool
+    """
+
+    def __init__(self, simulation, microphone_path, microphone, solvers, channels=None, profile=NO_PROFILE, source_indices=None, save_filters=True):
+        self.simulation = simulation
+        self.save_filters = save_filters
+        self.profile = profile
+        self.microphone_path = microphone_path
+        self.microphone = microphone
+        self.solvers = solvers
+        self.sources = simulation._prepared_sources(microphone.sample_rate)
+        if source_indices is not None:
+            self.solvers = [solvers[index] for index in source_indices]
+            self.sources = [self.sources[index] for index in source_indices]
+        self.channels = list(range(microphone.num_channels)) if channels is None else list(channels)
+        self.num_samples = int(microphone.sample_rate * microphone_path.duration)
+
+        # air absorption filter
+        self.bank = absorption.filter_bank(microphone.sample_rate, simulation.air, distance_step=simulation.distance_step, cache_dir=simulation.filter_cache_dir)
+        self._banks = {}
+        self._reset(0)
+
+    def _reset(self, start):
+        self.engines = [self.simulation._engine(self.bank, len(self.sources)) for _ in self.channels]
+        self.trackers = [[EmissionTracker(solver) for solver in self.solvers] for _ in self.channels]
+        self.reference_trackers = [EmissionTracker(solver) for solver in self.solvers]
+        self.latency = self.engines[0].latency
+        self.exact_samples = 0  # far field samples solved exactly, out of all the far field samples
+        self.far_field_samples = 0
+        self.position = start
+        self._input_stop = start
+
+    def seek(self, start):
+        """move a renderer that has not rendered anything yet to the output sample ``start``.
+
+        The state of the engines is rebuilt by rendering (and discarding) the samples preceding ``start``, going back
+        until the filter histories only depend on the rendered samples: the output is then identical to the one of a
+        renderer started from 0.
+        """
+        warmup = max(engine.warmup for engine in self.engines)
+        alignment = self.engines[0].alignment
+        while True:
+            begin = max(0, start - warmup) // alignment * alignment
+            self._reset(begin)
+            while self.position < start:
+                self.render(min(self.simulation.chunk_size, start - self.position))
+            if begin == 0 or all(engine.settled for engine in self.engines):
+                return
+            warmup *= 2
+
+    def render(self, count):
+        """return the next ``count`` output samples, shape (count, len(channels))."""
+        microphone = self.microphone
+        sources = self.sources
+        profile = self.profile
+        out_samples = np.zeros((count, len(self.channels)))
+
+        # the engine needs its input `latency` samples ahead of the output
+        input_start, self._input_stop = self._input_stop, self.position + count + self.latency
+        times_receiver = np.arange(input_start, self._input_stop) / microphone.sample_rate
+        with profile.stage("pose"):
+            position_array, rotation_array = self.microphone_path.get_positions(times_receiver)
+            # one rotation per receiver sample, applied to all the channels at once
+            world_positions = microphone.get_world_positions(position_array, rotation_array)
+
+        c, segments = None, [(self.bank, 0, len(times_receiver))]
+        if self.simulation.air.varying:
+            c, segments = self._atmosphere(times_receiver)
+
+        # far field: emission solved once per source at the array reference point and expanded to all the channels,
+        # see _far_field
+        expansions = None
+        if self.simulation.far_field:
+            with profile.stage("emission"):
+                expansions = self._far_field(times_receiver, position_array, world_positions[self.channels] - position_array, c)
+
+        for index, (channel_index, channel_trackers) in enumerate(zip(self.channels, self.trackers)):
+            positions_receiver = world_positions[channel_index]
+            samples = np.zeros((len(sources), len(times_receiver)))
+            distances = np.zeros((len(sources), len(times_receiver)))
+            for source_index, ((source_path, source), tracker) in enumerate(zip(sources, channel_trackers)):
+                with profile.stage("emission"):
+                    if expansions is None:
+                        times_emission, positions_emission = tracker.solve(times_receiver, positions_receiver, c)
+                        distances[source_index] = np.linalg.norm(positions_receiver - positions_emission, axis=1)
+                    else:
+                        times_expanded, distances_expanded, exact = expansions[source_index]
+                        times_emission, distances[source_index] = times_expanded[index], distances_expanded[index]
+                        if exact[index].any():
+                            exact = exact[index]
+                            times_exact, positions_exact = tracker.solve(times_receiver[exact], positions_receiver[exact], _take(c, exact))
+                            times_emission[exact] = times_exact
+                            distances[source_index, exact] = np.linalg.norm(positions_receiver[exact] - positions_exact, axis=1)
+                with profile.stage("source"):
+                    samples[source_index] = source_samples(source, times_emission, distances[source_index])
+
+            engine = self.engines[index]
+            outputs = []
+            for bank, start, stop in segments:
+                # filters are designed lazily by the engines: their design time is moved to its own stage
+                num_designs, design_time = bank.num_designs, bank.design_time
+                with profile.stage("filter"):
+                    engine.set_bank(bank)
+                    outputs.append(engine.process(samples[:, start:stop], distances[:, start:stop]))
+                if bank.num_designs > num_designs:
+                    design_time = bank.design_time - design_time
+                    profile.add("filter", -design_time, calls=0)
+                    profile.add("fir_design", design_time, calls=bank.num_designs - num_designs)
+            out_samples[:, index] = outputs[0] if len(outputs) == 1 else np.concatenate(outputs)
+
+        self.position += count
+        if self.save_filters and self.position >= self.num_samples:
+            self.bank.save()
+            for bank in self._banks.values():
+                bank.save()
+        return out_samples
+
+    def _far_field(self, times_receiver, position_array, offsets, c):
+        # first-order emission of all the channels around the reference point, for each source. Samples are marked to
+        # be solved exactly where the expansion does not apply or where its error exceeds the tolerances: on the delay
+        # (fraction of a sample) and on the geometric attenuation (relative error of the distance)
+        simulation = self.simulation
+        expansions = []
+        for tracker in self.reference_trackers:
+            time_reference, _, segment = tracker.solve(times_receiver, position_array, c, return_segments=True)
+            times_emission, distances, error = far_field(tracker.solver, times_receiver, position_array, time_reference, segment, offsets, c)
+            speed = tracker.solver.c if c is None else c
+            exact = ~((error < simulation.far_field_tolerance / self.microphone.sample_rate) & (speed * error < simulation.far_field_gain_tolerance * distances))
+            expansions.append((times_emission, distances, exact))
+            self.exact_samples += int(exact.sum())
+            self.far_field_samples += exact.size
+        return expansions
+
+    def _atmosphere(self, times_receiver):
+        # speed of sound of each receiver sample, and ranges of samples sharing the same grid point of the air table
+        air = self.simulation.air
+        temperature, pressure, relative_humidity = air.get_conditions(times_receiver)
+        table = air.table()
+        grid_index = table.grid_index(temperature, relative_humidity, pressure)
+        changes = np.flatnonzero((grid_index[1:] != grid_index[:-1]).any(axis=1)) + 1
+        bounds = [0, *changes.tolist(), len(times_receiver)]
+
+        segments = []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            key = tuple(grid_index[start].tolist())
+            bank = self._banks.get(key)
+            if bank is None:
+                grid_temperature, grid_relative_humidity, grid_pressure = table.grid_conditions(key)
+                grid_air = Air(temperature=grid_temperature, pressure=grid_pressure, relative_humidity=grid_relative_humidity)
+                bank = self._banks[key] = absorption.filter_bank(self.microphone.sample_rate, grid_air, distance_step=self.simulation.distance_step, cache_dir=self.simulation.filter_cache_dir, table=table)
+            segments.append((bank, start, stop))
+        return sound_speed(temperature + 273.15), segments
+
+    def chunks(self, stop=None):
+        """yield the output up to the sample ``stop`` (the end of the microphone path by default) in chunks."""
+        stop = self.num_samples if stop is None else min(stop, self.num_samples)
+        while self.position < stop:
+            yield self.render(min(self.simulation.chunk_size, stop - self.position))
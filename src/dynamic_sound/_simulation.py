@@ -1,30 +1,55 @@
-import os
-from tqdm import tqdm
+import time
 import numpy as np
-import wave
-from collections import deque
-from scipy.signal import firwin2, lfilter
-import struct
 
 from .environment import Air
-from .acoustics import attenuations
-from .acoustics.standards.ISO_9613_1_1993 import sound_speed, attenuation_coefficients, REFERENCE_TEMPERATURE, SOUND_SPEED
+from .acoustics.absorption import check_block_size
+from .acoustics.standards.ISO_9613_1_1993 import sound_speed, REFERENCE_TEMPERATURE, SOUND_SPEED
 from .environment import Path
 from .sources import Source
 from .microphones import MicrophoneArray
-from scipy.spatial.transform import Rotation as R
+from ._emission import EmissionSolver
+from ._engines import ENGINES, FftEngine
+from .outputs import BackgroundWriter, open_sink
+from ._renderer import Renderer
+from ._parallel import run_parallel
+from ._profile import NO_PROFILE, Profile, ProfiledSink, progress_callback, tracing
+from ._stems import STEM_ENGINES, export_stems, mix_stems, render_stems, stem_files
+from ._stream import BlockStream
 
 class Simulation:
-    def __init__(self, temperature=20, pressure=1, relative_humidity=50):
-        self.air = Air(temperature=temperature, pressure=pressure, relative_humidity=relative_humidity)
+    def __init__(self, temperature=20, pressure=1, relative_humidity=50, distance_step=1.0, filter_cache_dir=None, engine="reference", block_size=2_048, hop=512, chunk_size=4_096, air_timeline=None, resample_sources=True, source_oversampling=1, far_field=False, far_field_tolerance=0.05, far_field_gain_tolerance=1e-3, stem_cache_dir=None):
+        if engine not in ENGINES:
+            raise ValueError(f"unknown engine '{engine}', available engines: {', '.join(ENGINES)}")
+        if stem_cache_dir is not None and engine not in STEM_ENGINES:
+            raise ValueError(f"engine '{engine}' does not filter the sources independently, engines supporting stems: {', '.join(STEM_ENGINES)}")
+        if distance_step <= 0:
+            raise ValueError(f"distance_step ({distance_step}) must be positive")
+        if engine == "fft":
+            check_block_size(block_size, hop)
+
+        self.air = Air(temperature=temperature, pressure=pressure, relative_humidity=relative_humidity, timeline=air_timeline)
+        self.distance_step = distance_step  # [m] resolution of the air absorption filter bank
+        self.filter_cache_dir = filter_cache_dir
+        self.engine = engine
+        self.block_size = block_size  # [samples] FFT frame of the "fft" engine
+        self.hop = hop  # [samples] frame advance of the "fft" engine
+        self.chunk_size = chunk_size  # [samples] output samples rendered and written at a time
+        self.resample_sources = resample_sources  # convert sampled sources to the microphone rate before rendering
+        self.source_oversampling = source_oversampling  # rate of the converted sources, relative to the microphone one
+        self.far_field = far_field  # emission solved once per microphone array, then expanded to each channel
+        self.far_field_tolerance = far_field_tolerance  # [samples] largest emission time error of the far field expansion
+        self.far_field_gain_tolerance = far_field_gain_tolerance  # largest relative distance error of the expansion
+        self.stem_cache_dir = stem_cache_dir  # directory of the per-source contributions, re-rendered when they change
         self._microphones = []
         self._sources = []
+        self._prepared = {}
 
     def add_microphone(self, path:Path, microphone: MicrophoneArray):
         self._microphones.append((path, microphone))
 
     def add_source(self, path:Path, source:Source):
         self._sources.append((path, source))
+        self._prepared.clear()
 
     @staticmethod
     def _compute_emission(position_receiver, time_receiver, source_path, c=SOUND_SPEED):
@@ -62,52 +87,109 @@ class Simulation:
                             return time_emission, position_emission
         return None, None
 
-    def run(self):
+    def _engine(self, bank, num_sources):
+        if self.engine == "fft":
+            return FftEngine(bank, num_sources, block_size=self.block_size, hop=self.hop)
+        return ENGINES[self.engine](bank, num_sources)
+
+    def _render_microphone(self, microphone_path, microphone, solvers, profile=NO_PROFILE, progress=None):
+        renderer = Renderer(self, microphone_path, microphone, solvers, profile=profile)
+        sink = open_sink(microphone, renderer.num_samples)
+        if profile.enabled:
+            sink = ProfiledSink(sink, profile)
+
+        # blocks are encoded and written by a background thread while the next ones are computed
+        with BackgroundWriter(sink) as writer:
+            for out_samples in renderer.chunks():
+                writer.write(out_samples)
+                if progress is not None:
+                    progress(microphone, renderer.position, renderer.num_samples)
+
+    def _prepared_sources(self, sample_rate):
+        """return the (path, source) pairs read by the renders at ``sample_rate``, each source being prepared once."""
+        if not self.resample_sources:
+            return self._sources
+        rate = sample_rate * self.source_oversampling
+        sources = self._prepared.get(rate)
+        if sources is None:
+            prepared = {}
+            for _, source in self._sources:
+                if id(source) not in prepared:
+                    prepared[id(source)] = source.prepare(rate)
+            sources = self._prepared[rate] = [(path, prepared[id(source)]) for path, source in self._sources]
+        return sources
+
+    def _solvers(self):
         c = sound_speed(temperature=self.air.temperature+273.15)
-
-        for microphone_path, microphone in self._microphones:
-            dst_path = os.path.dirname(microphone.file_path)
-            if dst_path:
-                os.makedirs(dst_path, exist_ok=True)
-
-            with wave.open(microphone.file_path, mode="wb") as wave_file:
-                wave_file.setnchannels(microphone.num_channels)
-                wave_file.setsampwidth(microphone.sample_width)
-                wave_file.setframerate(microphone.sample_rate)
-
-                # air absorption filter
-                filter_len = 513
-                frequencies = np.linspace(0, microphone.sample_rate/2, num=512)
-                air_absorption_coefficients = attenuation_coefficients(
-                    frequency=frequencies,
-                    temperature=self.air.temperature + 273.15,
-                    relative_humidity=self.air.relative_humidity,
-                    pressure=self.air.pressure * 101.325
-                )
-
-                out_buffer = [deque(np.zeros(filter_len), maxlen=filter_len) for _ in range(microphone.num_channels)]
-                out_samples = np.zeros((int(microphone.sample_rate * microphone_path.duration), microphone.num_channels))
-
-                for sample_index, time_receiver in tqdm([(index, index/microphone.sample_rate) for index in range(int(microphone.sample_rate * microphone_path.duration))]):
-                    position_array, rotation_array = microphone_path.get_position(time_receiver)
-
-                    for channel_index, microphone_position in enumerate(microphone.get_microphones()):
-                        for source_path, source in self._sources:
-
-                            rotation_receiver = R.from_quat(rotation_array, scalar_first=True)
-                            position_receiver = position_array + rotation_receiver.apply(microphone_position[0:3])
-
-                            time_emission, position_emission = self._compute_emission(position_receiver=position_receiver, time_receiver=time_receiver, source_path=source_path, c=c)
-
-                            if time_emission is not None:
-                                distance = np.linalg.norm(position_receiver - position_emission)
-
-                                attenuation_geom = attenuations.geometric(distance)
-                                air_coeff = 10 ** (-air_absorption_coefficients * distance / 20.0)  # Convert coeffs in dB to linear scale
-                                air_fir_coefficients = firwin2(filter_len, frequencies, air_coeff, fs=microphone.sample_rate)
-
-                                out_buffer[channel_index].appendleft(source.get_sample(time_emission) * attenuation_geom)
-                                out_samples[sample_index, channel_index] += air_fir_coefficients.dot(out_buffer[channel_index])
-                
-                interleaved = (np.clip(out_samples, -1.0, 1.0) * np.iinfo(np.int32).max).astype(np.int32).reshape(-1)
-                wave_file.writeframes(struct.pack("<" + "i" * len(interleaved), *interleaved)) # int32 (little-endian)
+        return [EmissionSolver(source_path, c=c) for source_path, _ in self._sources]
+
+    def run(self, workers=1, partition="time", profile=False, progress=True):
+        """render all the microphones and write their output files.
+
+        :param workers: number of processes rendering in parallel, the output is identical to the serial one.
+        :type workers: int
+        :param partition: how the work is split across the processes: "microphone", "channel" (groups of channels of
+            each microphone, over consecutive segments) or "time" (consecutive segments of each microphone). With a
+            ``stem_cache_dir``, the missing stems are rendered by the processes instead, one stem per task.
+        :type partition: str
+        :param profile: record the wall time, calls and peak memory of each rendering stage.
+        :type profile: bool
+        :param progress: True for a tqdm bar per microphone, False or None for no progress reporting, or a callable
+            ``progress(microphone, done, total)`` called after each written block.
+        :return: the :class:`Profile` of the render when ``profile`` is true, None otherwise.
+        """
+        stats = Profile() if profile else NO_PROFILE
+        progress = progress_callback(progress)
+        start = time.perf_counter()
+        with tracing(stats):
+            # sources are converted again at every run, in case they or the settings changed, before the workers are
+            # started, which receive them with the simulation
+            with stats.stage("prepare"):
+                self._prepared.clear()
+                for _, microphone in self._microphones:
+                    self._prepared_sources(microphone.sample_rate)
+            if self.stem_cache_dir is not None:
+                files = stem_files(self)
+                render_stems(self, files, workers, profile=stats)
+                for microphone_index, microphone_files in enumerate(files):
+                    mix_stems(self, microphone_index, microphone_files, profile=stats, progress=progress)
+            elif workers > 1:
+                run_parallel(self, workers, partition, profile=stats, progress=progress)
+            else:
+                solvers = self._solvers()
+                for microphone_path, microphone in self._microphones:
+                    self._render_microphone(microphone_path, microphone, solvers, profile=stats, progress=progress)
+
+        if stats.enabled:
+            stats.wall_time = time.perf_counter() - start
+            return stats
+
+    def stream(self, microphone=0, block_size=1_024, prefetch=0):
+        """return an iterator (and asynchronous iterator) over the output of a microphone, rendered block by block as it
+        is consumed instead of being written to the microphone file, see :class:`BlockStream`.
+
+        :param microphone: index of the microphone, or the microphone itself.
+        :type microphone: int or MicrophoneArray
+        :param block_size: number of samples of each block, shape (block_size, num_channels).
+        :type block_size: int
+        :param prefetch: number of blocks rendered ahead by a background thread, 0 to render each block on demand.
+        :type prefetch: int
+        :return: the :class:`BlockStream` of the microphone.
+        """
+        return BlockStream(self, microphone, block_size=block_size, prefetch=prefetch)
+
+    def export_stems(self, output_dir, workers=1):
+        """write the contribution of each source to each microphone (stem) to its own file in ``output_dir``, rendering
+        the stems missing from the stem cache first.
+
+        :param output_dir: directory of the multitrack output.
+        :type output_dir: str
+        :param workers: number of processes rendering the missing stems.
+        :type workers: int
+        :return: the written files, one list of source files per microphone.
+        """
+        if self.stem_cache_dir is None:
+            raise ValueError("exporting stems requires a stem_cache_dir")
+        files = stem_files(self)
+        render_stems(self, files, workers)
+        return export_stems(self, output_dir, files)
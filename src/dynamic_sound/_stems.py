@@ -0,0 +1,158 @@
+import os
+import copy
+import pickle
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from . import _parallel
+from .outputs import BackgroundWriter, open_sink
+from ._profile import NO_PROFILE, Profile, ProfiledSink, tracing
+from ._files import _atomic_save
+from ._renderer import Renderer
+
+# engines filtering each source independently, whose output is the sum of the stems
+STEM_ENGINES = ("delay", "fft")
+
+
+def _array(values):
+    return None if values is None else np.array(values, dtype=np.float64)
+
+
+def source_digest(source):
+    """return the hash of a source, and of the modification time of its file if any."""
+    filename = getattr(source, "filename", None)
+    stamp = None
+    if filename is not None and os.path.isfile(filename):
+        stat = os.stat(filename)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    return hashlib.sha1(pickle.dumps((source, stamp))).hexdigest()
+
+
+def stem_key(simulation, microphone_path, microphone, source_path, digest):
+    """return the hash of everything the contribution of a source to a microphone depends on: the source (its
+    :func:`source_digest`), both paths, the array geometry, the air state and the rendering settings."""
+    from ._version import __version__
+
+    air = simulation.air
+    settings = (simulation.engine, simulation.distance_step, simulation.resample_sources, simulation.source_oversampling, simulation.far_field, simulation.far_field_tolerance, simulation.far_field_gain_tolerance)
+    if simulation.engine == "fft":
+        settings += (simulation.block_size, simulation.hop)
+    parts = (
+        __version__,
+        settings,
+        (air.temperature, air.pressure, air.relative_humidity, _array(air.timeline)),
+        (type(microphone).__name__, _array(microphone.positions), microphone.sample_rate),
+        _array(microphone_path.positions),
+        _array(source_path.positions),
+        digest,
+    )
+    return hashlib.sha1(pickle.dumps(parts)).hexdigest()
+
+
+def stem_files(simulation):
+    """return the cache files of the stems, one list of source files per microphone. Each source is hashed once."""
+    digests = {}
+    for _, source in simulation._sources:
+        if id(source) not in digests:
+            digests[id(source)] = source_digest(source)
+    return [[os.path.join(simulation.stem_cache_dir, f"stem_{stem_key(simulation, microphone_path, microphone, source_path, digests[id(source)])}.npy")
+             for source_path, source in simulation._sources] for microphone_path, microphone in simulation._microphones]
+
+
+def render_stem(simulation, microphone_index, source_index, solvers, file_path, profile=NO_PROFILE):
+    """render the contribution of a single source to all the channels of a microphone into ``file_path``."""
+    microphone_path, microphone = simulation._microphones[microphone_index]
+    renderer = Renderer(simulation, microphone_path, microphone, solvers, profile=profile, source_indices=[source_index])
+
+    def write(file):
+        if renderer.num_samples == 0:
+            np.save(file, np.zeros((0, microphone.num_channels)))
+            return
+        stem = np.lib.format.open_memmap(file, mode="w+", dtype=np.float64, shape=(renderer.num_samples, microphone.num_channels))
+        for out_samples in renderer.chunks():
+            stem[renderer.position - len(out_samples):renderer.position] = out_samples
+        stem.flush()
+        del stem
+
+    _atomic_save(file_path, write)
+
+
+def _render_stem_task(microphone_index, source_index, file_path):
+    # worker side of render_stems, on the simulation set by the pool initializer of _parallel
+    profile = Profile(memory=_parallel._profile.memory) if _parallel._profile else NO_PROFILE
+    with tracing(profile):
+        render_stem(_parallel._simulation, microphone_index, source_index, _parallel._solvers, file_path, profile=profile)
+    return profile if profile.enabled else None
+
+
+def render_stems(simulation, files, workers=1, profile=NO_PROFILE):
+    """render the stems missing from the cache, over a pool of ``workers`` processes.
+
+    :param files: cache files of the stems, see :func:`stem_files`.
+    :type files: list
+    :return: the number of rendered stems.
+    """
+    missing = {}
+    for microphone_index, microphone_files in enumerate(files):
+        for source_index, file_path in enumerate(microphone_files):
+            if not os.path.isfile(file_path):
+                # the same stem may be shared by several sources or microphones
+                missing.setdefault(file_path, (microphone_index, source_index))
+
+    if workers <= 1 or len(missing) <= 1:
+        solvers = simulation._solvers()
+        for file_path, (microphone_index, source_index) in missing.items():
+            render_stem(simulation, microphone_index, source_index, solvers, file_path, profile=profile)
+        return len(missing)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_parallel._init_worker, initargs=(simulation, profile if profile.enabled else False)) as pool:
+        futures = [pool.submit(_render_stem_task, microphone_index, source_index, file_path) for file_path, (microphone_index, source_index) in missing.items()]
+        for future in futures:
+            task_profile = future.result()
+            if task_profile is not None:
+                profile.merge(task_profile)
+    return len(missing)
+
+
+def mix_stems(simulation, microphone_index, files, profile=NO_PROFILE, progress=None):
+    """write the output of a microphone as the sum of its cached stems ``files``, one per source."""
+    microphone_path, microphone = simulation._microphones[microphone_index]
+    num_samples = int(microphone.sample_rate * microphone_path.duration)
+    stems = [np.load(file_path, mmap_mode="r") for file_path in files]
+    sink = open_sink(microphone, num_samples)
+    if profile.enabled:
+        sink = ProfiledSink(sink, profile)
+
+    with BackgroundWriter(sink) as writer:
+        for start in range(0, num_samples, simulation.chunk_size):
+            stop = min(start + simulation.chunk_size, num_samples)
+            out_samples = np.zeros((stop - start, microphone.num_channels))
+            for stem in stems:
+                out_samples += stem[start:stop]
+            writer.write(out_samples)
+            if progress is not None:
+                progress(microphone, stop, num_samples)
+
+
+def export_stems(simulation, output_dir, files):
+    """write the cached stems ``files`` (see :func:`stem_files`) as a multitrack output: one file per microphone and
+    source, in the format of the microphone output, named after the microphone file and the source index.
+
+    :return: the written files, one list of source files per microphone.
+    """
+    tracks = []
+    for (_, microphone), stem_paths in zip(simulation._microphones, files):
+        root, extension = os.path.splitext(os.path.basename(microphone.file_path))
+        microphone_files = []
+        for source_index, stem_path in enumerate(stem_paths):
+            stem = np.load(stem_path, mmap_mode="r")
+            track = copy.copy(microphone)
+            track.file_path = os.path.join(output_dir, f"{root}_source{source_index:02d}{extension}")
+            with BackgroundWriter(open_sink(track, len(stem))) as writer:
+                for start in range(0, len(stem), simulation.chunk_size):
+                    writer.write(np.array(stem[start:start + simulation.chunk_size]))
+            microphone_files.append(track.file_path)
+        tracks.append(microphone_files)
+    return tracks
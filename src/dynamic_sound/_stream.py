@@ -0,0 +1,132 @@
+import queue
+import asyncio
+import numbers
+import threading
+
+from ._renderer import Renderer
+
+_END = object()
+
+
+def _render_block(renderer, block_size):
+    if renderer.position >= renderer.num_samples:
+        return _END
+    return renderer.render(min(block_size, renderer.num_samples - renderer.position))
+
+
+def _produce(renderer, block_size, blocks, stop):
+    # producer thread: renders until the end of the stream or until it is closed, errors are handed to the consumer.
+    # It does not reference the stream, which is closed when it is no longer used
+    while not stop.is_set():
+        try:
+            block = _render_block(renderer, block_size)
+        except BaseException as error:
+            block = error
+        while not stop.is_set():
+            try:
+                blocks.put(block, timeout=0.1)
+                break
+            except queue.Full:
+                pass
+        if block is _END or isinstance(block, BaseException):
+            return
+
+
+class BlockStream:
+    """Iterator over the output of a microphone, rendered block by block while it is consumed, returned by
+    :meth:`Simulation.stream`.
+
+    Blocks have shape (block_size, num_channels), except the last one which holds the remaining samples. The renderer
+    keeps the filter and emission state between blocks, so the concatenated blocks are the output of
+    :meth:`Simulation.run`.
+
+    Without ``prefetch`` every block is rendered when it is requested, the consumer setting the pace. With
+    ``prefetch`` blocks, a background thread renders ahead of the consumer and waits once ``prefetch`` blocks are ready
+    (back-pressure), so that rendering overlaps with the processing of the previous blocks. The stream is also an
+    asynchronous iterator, rendering in a thread so that the event loop is not blocked. The background thread is stopped
+    by :meth:`close`, when leaving a ``with`` block or when the stream is garbage collected.
+
+    :param simulation: rendered simulation.
+    :type simulation: Simulation
+    :param microphone: index of the microphone in the simulation, or the microphone itself.
+    :type microphone: int or MicrophoneArray
+    :param block_size: number of samples of each block.
+    :type block_size: int
+    :param prefetch: number of blocks rendered ahead by a background thread, 0 to render on demand.
+    :type prefetch: int
+    """
+
+    def __init__(self, simulation, microphone=0, block_size=1_024, prefetch=0):
+        self._queue = None
+        self._stop = threading.Event()
+        if block_size <= 0:
+            raise ValueError(f"block_size ({block_size}) must be positive")
+        if isinstance(microphone, numbers.Integral):
+            if not 0 <= microphone < len(simulation._microphones):
+                raise ValueError(f"microphone index ({microphone}) out of range, the simulation has {len(simulation._microphones)} microphones")
+        else:
+            microphones = [item for _, item in simulation._microphones]
+            if microphone not in microphones:
+                raise ValueError("the microphone has not been added to the simulation")
+            microphone = microphones.index(microphone)
+        microphone_path, self.microphone = simulation._microphones[int(microphone)]
+        self.block_size = block_size
+        self.sample_rate = self.microphone.sample_rate
+        self.num_channels = self.microphone.num_channels
+        self._renderer = Renderer(simulation, microphone_path, self.microphone, simulation._solvers())
+        self.num_samples = self._renderer.num_samples
+        self.position = 0  # samples returned to the consumer so far
+
+        if prefetch > 0:
+            self._queue = queue.Queue(maxsize=prefetch)
+            self._thread = threading.Thread(target=_produce, args=(self._renderer, block_size, self._queue, self._stop), daemon=True)
+            self._thread.start()
+
+    def _next_block(self):
+        if self._stop.is_set():
+            return _END
+        if self._queue is None:
+            block = _render_block(self._renderer, self.block_size)
+        else:
+            block = self._queue.get()
+            if block is _END or isinstance(block, BaseException):
+                # the producer has stopped, the end (or the error) is kept for the next calls
+                self._queue.put(block)
+        if isinstance(block, BaseException):
+            raise block
+        if block is not _END:
+            self.position += len(block)
+        return block
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        block = self._next_block()
+        if block is _END:
+            raise StopIteration
+        return block
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        block = await asyncio.get_running_loop().run_in_executor(None, self._next_block)
+        if block is _END:
+            raise StopAsyncIteration
+        return block
+
+    def close(self):
+        """stop rendering, the stream ends without returning the blocks rendered ahead."""
+        self._stop.set()
+        if self._queue is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        self.close()
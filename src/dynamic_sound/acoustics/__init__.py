@@ -1,3 +1,3 @@
-from . import attenuations, doppler, utils
+from . import absorption, attenuations, doppler, utils
 from . import standards
 
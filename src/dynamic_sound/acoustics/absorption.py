@@ -0,0 +1,328 @@
+import os
+import time
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from .._files import _atomic_save
+from .standards.ISO_9613_1_1993 import absorption_terms, attenuation_coefficients, attenuation_coefficients_from_terms
+
+FILTER_LEN = 513
+NUM_FREQUENCIES = 512
+
+
+class AbsorptionTable:
+    """ISO 9613-1 air absorption tabulated on a regular grid of temperature, relative humidity and pressure.
+
+    The grid stores the frequency independent terms of the standard (classical absorption, strengths and relaxation
+    frequencies of oxygen and nitrogen): the coefficients at any frequency are obtained by interpolating these terms
+    and evaluating a rational function, without the exponentials of the standard. Values are exact at the grid points.
+
+    :param temperature_range: (min, max) temperature [°C].
+    :type temperature_range: tuple
+    :param relative_humidity_range: (min, max) relative humidity [%].
+    :type relative_humidity_range: tuple
+    :param pressure_range: (min, max) pressure [atm].
+    :type pressure_range: tuple
+    :param steps: grid steps of temperature [°C], relative humidity [%] and pressure [atm].
+    :type steps: tuple
+    """
+
+    def __init__(self, temperature_range=(-20.0, 50.0), relative_humidity_range=(0.0, 100.0), pressure_range=(0.9, 1.1), steps=(0.5, 1.0, 0.01)):
+        self.steps = np.asarray(steps, dtype=np.float64)
+        ranges = np.array([temperature_range, relative_humidity_range, pressure_range], dtype=np.float64)
+        first = np.floor(ranges[:, 0] / self.steps).astype(np.int64)
+        last = np.ceil(ranges[:, 1] / self.steps).astype(np.int64)
+        self.origin = first
+        self.shape = tuple(int(size) for size in last - first + 1)
+
+        temperature, relative_humidity, pressure = np.meshgrid(*(self.axis(dimension) for dimension in range(3)), indexing="ij")
+        self.terms = absorption_terms(temperature + 273.15, relative_humidity, pressure * 101.325)
+
+    @property
+    def key(self):
+        return (tuple(self.steps.tolist()), tuple(self.origin.tolist()), self.shape)
+
+    def axis(self, dimension):
+        return (self.origin[dimension] + np.arange(self.shape[dimension])) * self.steps[dimension]
+
+    def grid_index(self, temperature, relative_humidity, pressure):
+        """return the indices (..., 3) of the grid points nearest to the given conditions, clipped to the grid."""
+        conditions = np.stack(np.broadcast_arrays(temperature, relative_humidity, pressure), axis=-1)
+        index = np.rint(conditions / self.steps).astype(np.int64) - self.origin
+        return np.clip(index, 0, np.array(self.shape) - 1)
+
+    def grid_conditions(self, index):
+        """return the temperature [°C], relative humidity [%] and pressure [atm] of a grid point."""
+        return tuple(float(np.round((self.origin[dimension] + index[dimension]) * self.steps[dimension], 9)) for dimension in range(3))
+
+    def interpolate_terms(self, temperature, relative_humidity, pressure):
+        """return the trilinear interpolation (..., 5) of the terms, conditions outside the grid are clipped."""
+        conditions = np.stack(np.broadcast_arrays(temperature, relative_humidity, pressure), axis=-1)
+        position = np.clip(conditions / self.steps - self.origin, 0, np.array(self.shape) - 1)
+        lower = np.minimum(np.floor(position).astype(np.int64), np.array(self.shape) - 2).clip(0)
+        alpha = position - lower
+        upper = np.minimum(lower + 1, np.array(self.shape) - 1)
+
+        terms = 0.0
+        for corner in range(8):
+            bits = [(corner >> dimension) & 1 for dimension in range(3)]
+            index = tuple(np.where(bit, upper[..., dimension], lower[..., dimension]) for dimension, bit in enumerate(bits))
+            weight = np.prod([alpha[..., dimension] if bit else 1.0 - alpha[..., dimension] for dimension, bit in enumerate(bits)], axis=0)
+            terms = terms + weight[..., None] * self.terms[index]
+        return terms
+
+    def coefficients(self, frequency, temperature, relative_humidity, pressure):
+        """return the attenuation coefficients [dB/m] at the given frequencies [Hz], for scalar conditions."""
+        return attenuation_coefficients_from_terms(frequency, self.interpolate_terms(temperature, relative_humidity, pressure))
+
+
+class FilterBank:
+    """Air absorption FIR filters designed on a regular distance grid.
+
+    Filters are designed lazily, the first time a grid point is needed, and kept in a bounded LRU store. The filter for
+    an arbitrary distance is the linear interpolation of the two neighbouring grid filters, which is exact at the grid
+    points since ``firwin2`` is linear in the requested gains.
+
+    :param sample_rate: sample rate of the filtered signal [Hz].
+    :type sample_rate: int
+    :param temperature: air temperature [°C].
+    :type temperature: float
+    :param relative_humidity: relative humidity [%].
+    :type relative_humidity: float
+    :param pressure: air pressure [atm].
+    :type pressure: float
+    :param distance_step: grid resolution [m].
+    :type distance_step: float
+    :param filter_len: number of taps of each filter.
+    :type filter_len: int
+    :param max_filters: maximum number of grid filters kept in memory.
+    :type max_filters: int
+    :param cache_dir: optional directory where the designed filters are stored across runs.
+    :type cache_dir: str
+    :param table: optional table the attenuation coefficients are looked up from, instead of evaluating the standard.
+    :type table: AbsorptionTable
+    """
+
+    def __init__(self, sample_rate, temperature, relative_humidity, pressure, distance_step=1.0, filter_len=FILTER_LEN, max_filters=4_096, cache_dir=None, table=None):
+        if distance_step <= 0:
+            raise ValueError(f"distance_step ({distance_step}) must be positive")
+        self.sample_rate = sample_rate
+        self.temperature = temperature
+        self.relative_humidity = relative_humidity
+        self.pressure = pressure
+        self.distance_step = distance_step
+        self.filter_len = filter_len
+        self.max_filters = max_filters
+        self.cache_dir = cache_dir
+        self.table = table
+
+        self.frequencies = np.linspace(0, sample_rate/2, num=NUM_FREQUENCIES)
+        if table is not None:
+            self.coefficients = table.coefficients(self.frequencies, temperature, relative_humidity, pressure)
+        else:
+            self.coefficients = attenuation_coefficients(
+                frequency=self.frequencies,
+                temperature=temperature + 273.15,
+                relative_humidity=relative_humidity,
+                pressure=pressure * 101.325
+            )
+        self._filters = OrderedDict()
+        self._spectra = OrderedDict()
+        self.num_designs = 0  # filters designed so far, and time spent designing them [s]
+        self.design_time = 0.0
+        if cache_dir is not None and os.path.isfile(self.cache_file):
+            with np.load(self.cache_file) as data:
+                for grid_index, fir in zip(data["indices"], data["filters"]):
+                    self._store(int(grid_index), fir)
+
+    @property
+    def key(self):
+        table_key = None if self.table is None else self.table.key
+        return (self.sample_rate, self.temperature, self.relative_humidity, self.pressure, self.distance_step, self.filter_len, table_key)
+
+    @property
+    def cache_file(self):
+        digest = hashlib.sha1(repr(self.key).encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"air_filters_{digest}.npz")
+
+    def design(self, distance):
+        air_coeff = 10 ** (-self.coefficients * distance / 20.0)  # Convert coeffs in dB to linear scale
+        from scipy.signal import firwin2
+
+        return firwin2(self.filter_len, self.frequencies, air_coeff, fs=self.sample_rate)
+
+    def grid_filter(self, grid_index):
+        fir = self._filters.get(grid_index)
+        if fir is None:
+            start = time.perf_counter()
+            fir = self.design(grid_index * self.distance_step)
+            self.design_time += time.perf_counter() - start
+            self.num_designs += 1
+            self._store(grid_index, fir)
+        else:
+            self._filters.move_to_end(grid_index)
+        return fir
+
+    def filter(self, distance):
+        """return the FIR coefficients of the air absorption over the given distance."""
+        position = distance / self.distance_step
+        grid_index = int(position)
+        alpha = position - grid_index
+        if alpha == 0.0:
+            return self.grid_filter(grid_index)
+        return (1.0 - alpha) * self.grid_filter(grid_index) + alpha * self.grid_filter(grid_index + 1)
+
+    def grid_filters(self, distances):
+        """return the grid filters bracketing each distance, for a linear interpolation between them.
+
+        :param distances: distances [m], shape (N,).
+        :type distances: np.ndarray
+        :return: (filters, lower, upper, alphas): the grid filters used, shape (M, filter_len), the indices in
+            ``filters`` of the filters below and above each distance, and the interpolation weights of the upper ones.
+        """
+        positions = distances / self.distance_step
+        grid_indices = positions.astype(np.int64)
+        alphas = positions - grid_indices
+        upper_indices = np.where(alphas == 0.0, grid_indices, grid_indices + 1)
+        used = np.union1d(grid_indices, upper_indices)
+        filters = np.array([self.grid_filter(int(grid_index)) for grid_index in used])
+        return filters, np.searchsorted(used, grid_indices), np.searchsorted(used, upper_indices), alphas
+
+    def grid_spectrum(self, grid_index, nfft):
+        key = (grid_index, nfft)
+        spectrum = self._spectra.get(key)
+        if spectrum is None:
+            spectrum = np.fft.rfft(self.grid_filter(grid_index), nfft)
+            self._spectra[key] = spectrum
+            if len(self._spectra) > self.max_filters:
+                self._spectra.popitem(last=False)
+        else:
+            self._spectra.move_to_end(key)
+        return spectrum
+
+    def spectrum(self, distance, nfft):
+        """return the ``nfft`` points real FFT of :meth:`filter`, interpolated between the cached grid spectra."""
+        position = distance / self.distance_step
+        grid_index = int(position)
+        alpha = position - grid_index
+        if alpha == 0.0:
+            return self.grid_spectrum(grid_index, nfft)
+        return (1.0 - alpha) * self.grid_spectrum(grid_index, nfft) + alpha * self.grid_spectrum(grid_index + 1, nfft)
+
+    def save(self):
+        if self.cache_dir is None:
+            return
+        indices = np.fromiter(self._filters.keys(), dtype=np.int64, count=len(self._filters))
+        filters = np.array(list(self._filters.values())).reshape(len(indices), self.filter_len)
+        _atomic_save(self.cache_file, lambda file: np.savez(file, indices=indices, filters=filters))
+
+    def _store(self, grid_index, fir):
+        self._filters[grid_index] = fir
+        if len(self._filters) > self.max_filters:
+            self._filters.popitem(last=False)
+
+
+def check_block_size(block_size, hop):
+    """raise a ValueError unless ``block_size`` is a multiple of ``hop`` and at least twice as large."""
+    if hop <= 0 or block_size % hop != 0 or block_size < 2 * hop:
+        raise ValueError(f"block_size ({block_size}) must be a multiple of hop ({hop}) and at least twice as large")
+
+
+class BlockFilter:
+    """Time-varying air absorption of a single signal, computed block-wise with FFT overlap-add.
+
+    The input is split in Hann-windowed frames of ``block_size`` samples taken every ``hop`` samples. Each frame is
+    filtered with the bank filter at the mean distance of the frame, so that overlapping frames crossfade between
+    neighbouring filters as the distance changes. Larger blocks lower the cost per sample, smaller hops follow faster
+    distance changes.
+
+    Output sample ``n`` is only final once the input sample ``n + latency`` has been processed: :meth:`process` returns
+    ``latency`` samples less than it receives in total.
+
+    :param bank: filter bank providing the absorption filters.
+    :type bank: FilterBank
+    :param block_size: number of samples of each frame.
+    :type block_size: int
+    :param hop: number of samples between consecutive frames, ``block_size`` must be a multiple of it.
+    :type hop: int
+    """
+
+    def __init__(self, bank, block_size=2_048, hop=512):
+        check_block_size(block_size, hop)
+
+        self.bank = bank
+        self.block_size = block_size
+        self.hop = hop
+        self.latency = block_size - 1
+        self.nfft = 1 << int(np.ceil(np.log2(block_size + bank.filter_len - 1)))
+
+        # periodic Hann window, scaled so that the overlapped frames add up to one
+        self.window = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(block_size) / block_size)) * 2 * hop / block_size
+
+        # the first frames start before the signal, so that every sample is covered by the same number of frames
+        self._samples = np.zeros(block_size - hop)
+        self._distances = np.full(block_size - hop, np.nan)
+        self._accumulator = np.zeros(block_size + bank.filter_len - 1)
+        self._ready = np.zeros(0)
+        self._skip = block_size - hop
+        self._received = 0
+        self._returned = 0
+
+    def process(self, samples, distances):
+        """filter the next input samples.
+
+        :param samples: input samples, already scaled by the geometric attenuation.
+        :type samples: np.ndarray
+        :param distances: source distance of each sample, NaN where no sound is received.
+        :type distances: np.ndarray
+        :return: the output samples made final by this input.
+        """
+        self._samples = np.concatenate([self._samples, samples])
+        self._distances = np.concatenate([self._distances, distances])
+        self._received += len(samples)
+
+        outputs = [self._ready]
+        while len(self._samples) >= self.block_size:
+            frame_distances = self._distances[:self.block_size]
+            valid = ~np.isnan(frame_distances)
+            if valid.any():
+                spectrum = self.bank.spectrum(frame_distances[valid].mean(), self.nfft)
+                frame = np.fft.rfft(self.window * self._samples[:self.block_size], self.nfft)
+                self._accumulator += np.fft.irfft(frame * spectrum, self.nfft)[:len(self._accumulator)]
+
+            outputs.append(self._accumulator[:self.hop].copy())
+            self._accumulator[:-self.hop] = self._accumulator[self.hop:]
+            self._accumulator[-self.hop:] = 0.0
+            self._samples = self._samples[self.hop:]
+            self._distances = self._distances[self.hop:]
+
+        ready = np.concatenate(outputs)
+        if self._skip > 0:
+            skipped = min(self._skip, len(ready))
+            ready = ready[skipped:]
+            self._skip -= skipped
+
+        count = max(0, self._received - self.latency) - self._returned
+        self._ready = ready[count:]
+        self._returned += count
+        return ready[:count]
+
+
+_banks = OrderedDict()
+MAX_BANKS = 8
+
+
+def filter_bank(sample_rate, air, distance_step=1.0, filter_len=FILTER_LEN, cache_dir=None, table=None):
+    """return the filter bank for the given air state, shared by all the renders running in this process."""
+    key = (sample_rate, air.temperature, air.relative_humidity, air.pressure, distance_step, filter_len, cache_dir, table is not None)
+    bank = _banks.get(key)
+    if bank is None:
+        bank = FilterBank(sample_rate, air.temperature, air.relative_humidity, air.pressure, distance_step=distance_step, filter_len=filter_len, cache_dir=cache_dir, table=table)
+        _banks[key] = bank
+        if len(_banks) > MAX_BANKS:
+            _banks.popitem(last=False)
+    else:
+        _banks.move_to_end(key)
+    return bank
@@ -1,9 +1,14 @@
+import numpy as np
+
 
 def geometric(distance:float) -> float:
+    if np.ndim(distance) > 0:
+        distance = np.asarray(distance, dtype=np.float64)
+        with np.errstate(divide="ignore"):
+            return np.where(distance == 0, 1.0, 1.0 / distance)
     if distance == 0:
         return 1.0
     return 1.0 / distance
 
 def material_reflection(coeff):
     return 1.0
-
@@ -35,6 +35,24 @@ def attenuation_coefficients(frequency, temperature, relative_humidity, pressure
         )
     )
 
+def absorption_terms(temperature, relative_humidity, pressure, reference_temperature=REFERENCE_TEMPERATURE, reference_pressure=REFERENCE_PRESSURE, triple_temperature=TRIPLE_TEMPERATURE):  # (ISO 9613-1: 5)
+    """return the frequency independent terms of the attenuation coefficients, stacked on the last axis: classical
+    absorption, oxygen strength and relaxation frequency, nitrogen strength and relaxation frequency."""
+    Psat = saturation_pressure(temperature=temperature, reference_pressure=reference_pressure, triple_temperature=triple_temperature)
+    h = molar_concentration_water_vapour(relative_humidity=relative_humidity, saturation_pressure=Psat, pressure=pressure)
+    frO = relaxation_frequency_oxygen(pressure=pressure, h=h, reference_pressure=reference_pressure)
+    frN = relaxation_frequency_nitrogen(pressure, temperature, h, reference_temperature=reference_temperature, reference_pressure=reference_pressure)
+
+    classical = 1.84e-11 * (pressure / reference_pressure)**(-1.0) * (temperature / reference_temperature)**0.5
+    oxygen = (temperature / reference_temperature)**(-5.0/2.0) * 0.01275 * np.exp(-2239.1 / temperature)
+    nitrogen = (temperature / reference_temperature)**(-5.0/2.0) * 0.1068 * np.exp(-3352.0 / temperature)
+    return np.stack(np.broadcast_arrays(classical, oxygen, frO, nitrogen, frN), axis=-1)
+
+def attenuation_coefficients_from_terms(frequency, terms):  # (ISO 9613-1: 5)
+    """return the attenuation coefficients given the terms of :func:`absorption_terms`."""
+    classical, oxygen, frO, nitrogen, frN = np.moveaxis(terms, -1, 0)
+    return 8.686 * frequency**2 * (classical + oxygen / (frO + (frequency**2 / frO)) + nitrogen / (frN + (frequency**2 / frN)))
+
 if __name__ == "__main__":
     print(sound_speed(273.15+20))
 
@@ -1,11 +1,59 @@
+import numpy as np
+
+from ..acoustics.absorption import AbsorptionTable
+from ..acoustics.standards.ISO_9613_1_1993 import sound_speed
+
 
 class Air:
-    def __init__(self, temperature, pressure, relative_humidity):
+    """State of the air: temperature [°C], pressure [atm] and relative humidity [%].
+
+    Conditions can change over the scene timeline with ``timeline``, an array of rows
+    ``[time, temperature, pressure, relative_humidity]`` sorted by time, linearly interpolated and held constant before
+    the first and after the last row. The constant values are then the ones of the first row, and :meth:`set` has no
+    effect on the timeline.
+    """
+
+    def __init__(self, temperature, pressure, relative_humidity, timeline=None):
         self.temperature = temperature
         self.pressure = pressure
         self.relative_humidity = relative_humidity
-    
+        self.timeline = None
+        self._table = None
+        if timeline is not None:
+            self.timeline = np.atleast_2d(np.array(timeline, dtype=np.float64))
+            if np.any(np.diff(self.timeline[:, 0]) < 0):
+                raise ValueError("the air timeline must be sorted by time")
+            self.temperature, self.pressure, self.relative_humidity = (float(value) for value in self.timeline[0, 1:4])
+
     def set(self, temperature=None, pressure=None, relative_humidity=None):
         self.temperature = temperature if temperature is not None else self.temperature
         self.pressure = pressure if pressure is not None else self.pressure
         self.relative_humidity = relative_humidity if relative_humidity is not None else self.relative_humidity
+
+    @property
+    def varying(self):
+        return self.timeline is not None and len(self.timeline) > 1
+
+    def get_conditions(self, times):
+        """return the temperature, pressure and relative humidity arrays at the given times."""
+        times = np.asarray(times, dtype=np.float64)
+        if not self.varying:
+            return tuple(np.full(times.shape, value, dtype=np.float64) for value in (self.temperature, self.pressure, self.relative_humidity))
+        return tuple(np.interp(times, self.timeline[:, 0], self.timeline[:, column]) for column in (1, 2, 3))
+
+    def get_sound_speed(self, times):
+        """return the speed of sound [m/s] at the given times."""
+        temperature, _, _ = self.get_conditions(times)
+        return sound_speed(temperature + 273.15)
+
+    def table(self):
+        """return the absorption table covering the conditions of the timeline, built on first use."""
+        if self._table is None:
+            conditions = self.timeline[:, 1:4] if self.timeline is not None else np.array([[self.temperature, self.pressure, self.relative_humidity]])
+            minimum, maximum = conditions.min(axis=0), conditions.max(axis=0)
+            self._table = AbsorptionTable(
+                temperature_range=(minimum[0], maximum[0]),
+                relative_humidity_range=(minimum[2], maximum[2]),
+                pressure_range=(minimum[1], maximum[1])
+            )
+        return self._table
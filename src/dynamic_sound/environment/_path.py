@@ -1,70 +1,220 @@
 import os
 import numpy as np
-from scipy.spatial.transform import Rotation, Slerp
-from scipy.interpolate import interp1d
 
 class Path:
-    def __init__(self, positions=None, *, file=None):
+    def __init__(self, positions=None, *, file=None, mmap=False):
+        self._keyframe_cache = None
         self.positions = None
         self.duration = 0.0
+        self._mmap_file = None
 
         if positions is not None:
             self.positions = np.array(positions, dtype=np.float64)
             self.duration = self.positions[-1, 0] - self.positions[0, 0]
         
         if file is not None:
-            self.load_path(file)
+            self.load_path(file, mmap=mmap)
 
-    def save_path(self, file_path):
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        np.savetxt(file_path, self.positions, delimiter=',')
+    @property
+    def positions(self):
+        """waypoints, one row ``[time, x, y, z, qw, qx, qy, qz]`` per waypoint.
+
+        The keyframes used by :meth:`get_positions` are rebuilt when the waypoints are assigned. After modifying the
+        times or the quaternions in place, call :meth:`reset_keyframes` (or assign the array again).
+        """
+        return self._positions
+
+    @positions.setter
+    def positions(self, positions):
+        self._positions = positions
+        self._keyframe_cache = None
+
+    def reset_keyframes(self):
+        """drop the keyframes computed from the waypoints, after they have been modified in place."""
+        self._keyframe_cache = None
 
-    def load_path(self, file_path):
-        self.positions = np.genfromtxt(file_path, delimiter=',', dtype=np.float64)
+    def save_path(self, file_path):
+        """write the path to ``file_path``: binary ``.npy`` or ``.npz`` according to the extension, CSV otherwise."""
+        dst_path = os.path.dirname(file_path)
+        if dst_path:
+            os.makedirs(dst_path, exist_ok=True)
+        extension = os.path.splitext(file_path)[1].lower()
+        if extension == ".npy":
+            np.save(file_path, self.positions)
+        elif extension == ".npz":
+            np.savez(file_path, positions=self.positions)
+        else:
+            np.savetxt(file_path, self.positions, delimiter=',')
+
+    def load_path(self, file_path, mmap=False):
+        """read a path written by :meth:`save_path`, the format is detected from the content of the file.
+
+        :param file_path: ``.npy``, ``.npz`` or CSV file with one waypoint per row.
+        :type file_path: str
+        :param mmap: memory-map a ``.npy`` file (read-only) instead of reading it. Memory-mapped paths are sent to
+            worker processes as a reference to the file, without copying the waypoints.
+        :type mmap: bool
+        """
+        file_format = _detect_format(file_path)
+        self._mmap_file = None
+        if file_format == "npy":
+            self.positions = np.load(file_path, mmap_mode="r" if mmap else None)
+            if mmap:
+                self._mmap_file = os.path.abspath(file_path)
+        elif file_format == "npz":
+            with np.load(file_path) as data:
+                self.positions = data["positions"] if "positions" in data else data[data.files[0]]
+        else:
+            self.positions = np.loadtxt(file_path, delimiter=',', dtype=np.float64, ndmin=2)
+        if self.positions.dtype != np.float64:
+            self.positions = self.positions.astype(np.float64)
         self.duration = self.positions[-1][0] - self.positions[0][0]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_keyframe_cache"] = None
+        if isinstance(self.positions, np.memmap) and self._mmap_file is not None:
+            state["_positions"] = None
+        else:
+            state["_mmap_file"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self._mmap_file is not None:
+            self.positions = np.load(self._mmap_file, mmap_mode="r")
     
     def get_position(self, time):
-        # Ensure time is within range
-        if self.positions[0, 0] <= time < self.positions[-1, 0]:
-
-            # Find interval containing `time`
-            for i in range(len(self.positions) - 1):
-                t0 = self.positions[i, 0]
-                t1 = self.positions[i + 1, 0]
-                if t0 <= time < t1:
-                    # Linear interpolation factor
-                    alpha = (time - t0) / (t1 - t0)
-
-                    # --- Position interpolation (linear) ---
-                    p0 = self.positions[i, 1:4]
-                    p1 = self.positions[i + 1, 1:4]
-                    position = p0 + alpha * (p1 - p0)
-
-                    # --- Rotation interpolation (slerp) ---
-                    q0 = self.positions[i, 4:8]
-                    q1 = self.positions[i + 1, 4:8]
-                    
-                    q0 /= np.linalg.norm(q0)  # Normalize quaternions to avoid numerical issues
-                    q1 /= np.linalg.norm(q1)
-
-                    # Create Rotation objects
-                    key_rots = Rotation.from_quat([q0, q1], scalar_first=True)
-                    key_times = [0, 1]
-
-                    # Create Slerp object
-                    slerp = Slerp(key_times, key_rots)
-
-                    # Interpolate
-                    interp_rot = slerp([alpha])[0]
-                    rotation = interp_rot.as_quat(scalar_first=True)
-
-                    return position, rotation
+        position, rotation = self.get_positions(np.array([time], dtype=np.float64))
         
         # If time not in the range
-        return None, None
+        if np.isnan(position[0, 0]):
+            return None, None
+        return position[0], rotation[0]
+
+    def get_positions(self, times):
+        """return the positions and the rotations of the path at the given time instants.
+
+        Positions are linearly interpolated and rotations are interpolated with slerp between the two waypoints
+        surrounding each time instant.
+
+        :param times: time instants, shape (N,).
+        :type times: np.ndarray
+        :return: positions (N, 3) and quaternions (N, 4) in scalar-first order, NaN where the time is out of the path range.
+        """
+        from scipy.spatial.transform import Rotation
+
+        times = np.asarray(times, dtype=np.float64)
+        key_times, key_rots, delta_rotvecs = self._keyframes()
+
+        position = np.full((len(times), 3), np.nan)
+        rotation = np.full((len(times), 4), np.nan)
+
+        # Ensure time is within range
+        valid = (key_times[0] <= times) & (times < key_times[-1])
+        if not valid.any():
+            return position, rotation
+
+        # Find interval containing each time
+        t = times[valid]
+        i = np.searchsorted(key_times, t, side="right") - 1
+
+        # Linear interpolation factor
+        alpha = (t - key_times[i]) / (key_times[i + 1] - key_times[i])
+
+        # --- Position interpolation (linear) ---
+        p0 = self.positions[i, 1:4]
+        p1 = self.positions[i + 1, 1:4]
+        position[valid] = p0 + alpha[:, None] * (p1 - p0)
+
+        # --- Rotation interpolation (slerp) ---
+        interp_rot = key_rots[i] * Rotation.from_rotvec(delta_rotvecs[i] * alpha[:, None])
+        rotation[valid] = interp_rot.as_quat(scalar_first=True)
+
+        return position, rotation
+
+    def _keyframes(self):
+        # normalized keyframe rotations and relative rotation of each segment, computed once per assignment of positions
+        if self._keyframe_cache is not None:
+            return self._keyframe_cache
+
+        from scipy.spatial.transform import Rotation
+
+        key_times = self.positions[:, 0].copy()
+        quat = self.positions[:, 4:8]
+        quat = quat / np.linalg.norm(quat, axis=1, keepdims=True)  # Normalize quaternions to avoid numerical issues
+        key_rots = Rotation.from_quat(quat, scalar_first=True)
+        delta_rotvecs = (key_rots[:-1].inv() * key_rots[1:]).as_rotvec()
+
+        self._keyframe_cache = (key_times, key_rots, delta_rotvecs)
+        return self._keyframe_cache
+
+    def simplify(self, max_position_error=0.01, max_angle_error=0.5):
+        """remove the waypoints that can be linearly interpolated (and slerped) from the remaining ones.
+
+        Space-time Douglas-Peucker: every removed waypoint is compared with the simplified path at the same time
+        instant, so that both the position and the orientation of the path at any waypoint time stay within the bounds.
+
+        :param max_position_error: maximum distance between a removed waypoint and the simplified path [m].
+        :type max_position_error: float
+        :param max_angle_error: maximum rotation angle between a removed waypoint and the simplified path [°].
+        :type max_angle_error: float
+        :return: the achieved maximum position error [m] and angle error [°].
+        """
+        times = self.positions[:, 0]
+        quat = self.positions[:, 4:8] / np.linalg.norm(self.positions[:, 4:8], axis=1, keepdims=True)
+        max_angle_error = np.radians(max_angle_error)
+
+        keep = np.zeros(len(times), dtype=bool)
+        keep[[0, -1]] = True
+        position_error = np.zeros(len(times))
+        angle_error = np.zeros(len(times))
+        stack = [(0, len(times) - 1)]
+        while stack:
+            first, last = stack.pop()
+            if last - first < 2:
+                continue
+            inner = np.arange(first + 1, last)
+            position_error[inner], angle_error[inner] = self._segment_errors(first, last, inner, quat)
+            excess = np.maximum(position_error[inner] / max(max_position_error, 1e-12), angle_error[inner] / max(max_angle_error, 1e-12))
+            worst = np.argmax(excess)
+            if position_error[inner[worst]] > max_position_error or angle_error[inner[worst]] > max_angle_error:
+                split = inner[worst]
+                keep[split] = True
+                stack.append((first, split))
+                stack.append((split, last))
+
+        # errors of the removed waypoints with respect to the final segments
+        removed = ~keep
+        self.positions = self.positions[keep]
+        return float(position_error[removed].max(initial=0.0)), float(np.degrees(angle_error[removed].max(initial=0.0)))
+
+    def _segment_errors(self, first, last, inner, quat):
+        # distance and angle between the waypoints `inner` and the interpolation between waypoints `first` and `last`
+        times = self.positions[:, 0]
+        alpha = ((times[inner] - times[first]) / (times[last] - times[first]))[:, None]
+        p0 = self.positions[first, 1:4]
+        p1 = self.positions[last, 1:4]
+        position_error = np.linalg.norm(p0 + alpha * (p1 - p0) - self.positions[inner, 1:4], axis=1)
+
+        # slerp along the shortest arc, as get_positions
+        q0 = quat[first]
+        q1 = quat[last] if np.dot(quat[first], quat[last]) >= 0 else -quat[last]
+        theta = np.arccos(np.clip(np.dot(q0, q1), -1.0, 1.0))
+        if theta < 1e-9:
+            interp_quat = q0 + alpha * (q1 - q0)
+        else:
+            interp_quat = (np.sin((1 - alpha) * theta) * q0 + np.sin(alpha * theta) * q1) / np.sin(theta)
+        interp_quat /= np.linalg.norm(interp_quat, axis=1, keepdims=True)
+
+        q = quat[inner] * np.where(np.sum(interp_quat * quat[inner], axis=1, keepdims=True) < 0, -1.0, 1.0)
+        angle_error = 2 * np.arctan2(np.linalg.norm(interp_quat - q, axis=1), np.linalg.norm(interp_quat + q, axis=1))
+        return position_error, angle_error
 
-    
     def interpolate_path(self, num_points=50):
+        from scipy.interpolate import interp1d
+        from scipy.spatial.transform import Rotation, Slerp
+
         # Split input
         t = self.positions[:, 0]
         pos = self.positions[:, 1:4]
@@ -137,6 +287,7 @@ class Path:
 
     def plot_quaternion_directions(self, show=True, ax=None, step=1, scale=0.1, legend=True):
         import matplotlib.pyplot as plt
+        from scipy.spatial.transform import Rotation
 
         pos = self.positions[:, 1:4]
         quat = self.positions[:, 4:8]
@@ -185,3 +336,13 @@ class Path:
         if show:
             plt.show()
         return ax
+
+
+def _detect_format(file_path):
+    with open(file_path, "rb") as file:
+        magic = file.read(6)
+    if magic == b"\x93NUMPY":
+        return "npy"
+    if magic[:4] == b"PK\x03\x04":
+        return "npz"
+    return "csv"
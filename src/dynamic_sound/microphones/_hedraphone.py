@@ -4,17 +4,18 @@ import numpy as np
 
 import random
 from collections import namedtuple
-from scipy.spatial.transform import Rotation
 
 class Hedraphone(MicrophoneArray):
     MicPCB = namedtuple('MicPCB', ['mics', 'faces'])
     
     @staticmethod
     def rotate_points(points: np.ndarray, angle_z: float, angle_y: float, angle_x: float) -> np.ndarray:
+        from scipy.spatial.transform import Rotation
+
         R= Rotation.from_euler('zyx', [angle_z, angle_y, angle_x], degrees=True).as_matrix()
         return R @ points
 
-    def __init__(self, file_path, num_external_mics=6, radius_mics=0.012, radius_pcb=0.022, thickness=0.05, sideboard_angle=30, spacing=0.0, rnd_angle=None, rnd_position=None, sample_rate = 48_000, sample_width=4):
+    def __init__(self, file_path, num_external_mics=6, radius_mics=0.012, radius_pcb=0.022, thickness=0.05, sideboard_angle=30, spacing=0.0, rnd_angle=None, rnd_position=None, sample_rate = 48_000, sample_width=4, output=None):
         self.pcb = []
         mics = self._generate_mics(num_external_mics, radius_mics)
         faces = self._generate_faces(num_external_mics, radius_pcb, thickness)
@@ -74,7 +75,7 @@ class Hedraphone(MicrophoneArray):
         
         positions = np.concatenate([pcb.mics for pcb in self.pcb], axis=1).T
         rotations = np.tile([1, 0, 0, 0], (len(positions), 1))
-        super().__init__(file_path, np.hstack((positions, rotations)), sample_rate, sample_width)
+        super().__init__(file_path, np.hstack((positions, rotations)), sample_rate, sample_width, output)
 
     def _generate_mics(self, num_mics, radius):
         mics = [(0.0, 0.0, 0.0)]
@@ -123,12 +124,12 @@ class Hedraphone(MicrophoneArray):
 
 
 class Hedraphone_v1(Hedraphone):
-    def __init__(self, file_path, rnd_angle=None, rnd_position=None, sample_rate=48000, sample_width=4):
-        super().__init__(file_path, num_external_mics=5, radius_mics=0.012, radius_pcb=0.022, thickness=0.00155, sideboard_angle=63.43, spacing=0.022, rnd_angle=rnd_angle, rnd_position=rnd_position, sample_rate=sample_rate, sample_width=sample_width)
+    def __init__(self, file_path, rnd_angle=None, rnd_position=None, sample_rate=48000, sample_width=4, output=None):
+        super().__init__(file_path, num_external_mics=5, radius_mics=0.012, radius_pcb=0.022, thickness=0.00155, sideboard_angle=63.43, spacing=0.022, rnd_angle=rnd_angle, rnd_position=rnd_position, sample_rate=sample_rate, sample_width=sample_width, output=output)
 
 
 class Hedraphone_v2(Hedraphone):
-    def __init__(self, file_path, rnd_angle=None, rnd_position=None, sample_rate=48000, sample_width=4):
-        super().__init__(file_path, num_external_mics=5, radius_mics=0.014, radius_pcb=0.022, thickness=0.00155, sideboard_angle=63.43, spacing=0.022, rnd_angle=rnd_angle, rnd_position=rnd_position, sample_rate=sample_rate, sample_width=sample_width)
+    def __init__(self, file_path, rnd_angle=None, rnd_position=None, sample_rate=48000, sample_width=4, output=None):
+        super().__init__(file_path, num_external_mics=5, radius_mics=0.014, radius_pcb=0.022, thickness=0.00155, sideboard_angle=63.43, spacing=0.022, rnd_angle=rnd_angle, rnd_position=rnd_position, sample_rate=sample_rate, sample_width=sample_width, output=output)
 
 
@@ -1,17 +1,36 @@
 import numpy as np
 
 class MicrophoneArray:
-    def __init__(self, file_path:str, positions:list, sample_rate:int=48_000, sample_width=4):
+    def __init__(self, file_path:str, positions:list, sample_rate:int=48_000, sample_width=4, output=None):
         self.positions = np.array(positions, dtype=np.float64)
         self.num_channels = len(self.positions)
         self.sample_width = sample_width
         self.file_path = file_path
         self.sample_rate = sample_rate
+        self.output = output  # None (from the file extension), "wav", "float_wav", "npy", "raw" or a Sink subclass
 
     def get_microphones(self) -> np.ndarray:
         return self.positions
 
+    def get_world_positions(self, position_array:np.ndarray, rotation_array:np.ndarray) -> np.ndarray:
+        """return the world positions of all the microphones for a sequence of array poses, with one rotation matrix per pose.
+
+        :param position_array: positions of the array, shape (N, 3), NaN rows for undefined poses.
+        :type position_array: np.ndarray
+        :param rotation_array: scalar-first quaternions of the array, shape (N, 4).
+        :type rotation_array: np.ndarray
+        :return: positions with shape (num_channels, N, 3).
+        """
+        positions = np.full((self.num_channels, len(position_array), 3), np.nan)
+        valid = ~np.isnan(position_array[:, 0])
+        if valid.any():
+            from scipy.spatial.transform import Rotation
+
+            matrices = Rotation.from_quat(rotation_array[valid], scalar_first=True).as_matrix()
+            positions[:, valid] = position_array[valid] + np.einsum("nij,cj->cni", matrices, self.positions[:, 0:3])
+        return positions
+
 class Microphone(MicrophoneArray):
-    def __init__(self, file_path:str, sample_rate:int=48_000, sample_width=4):
+    def __init__(self, file_path:str, sample_rate:int=48_000, sample_width=4, output=None):
         position = [[0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0], ]
-        super().__init__(file_path, position, sample_rate, sample_width)
+        super().__init__(file_path, position, sample_rate, sample_width, output)
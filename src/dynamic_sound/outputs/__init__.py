@@ -0,0 +1,2 @@
+from ._sinks import Sink, WaveSink, FloatWaveSink, NpySink, RawSink, SINKS, encode_pcm, open_sink
+from ._writer import BackgroundWriter
@@ -0,0 +1,172 @@
+import os
+import wave
+import struct
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+def _makedirs(file_path):
+    dst_path = os.path.dirname(file_path)
+    if dst_path:
+        os.makedirs(dst_path, exist_ok=True)
+
+
+def encode_pcm(samples, sample_width):
+    """return the little-endian PCM bytes of the samples, clipped to [-1, 1].
+
+    :param samples: samples in [-1, 1], frames on the first axis and channels on the second one.
+    :type samples: np.ndarray
+    :param sample_width: bytes per sample: 1 (unsigned), 2, 3 or 4.
+    :type sample_width: int
+    """
+    samples = np.clip(samples, -1.0, 1.0)
+    if sample_width == 1:
+        return (samples * np.iinfo(np.int8).max + 128).astype(np.uint8).tobytes()
+    if sample_width == 2:
+        return (samples * np.iinfo(np.int16).max).astype("<i2").tobytes()
+    if sample_width == 3:
+        pcm = (samples * (2**23 - 1)).astype("<i4")
+        return pcm.view(np.uint8).reshape(-1, 4)[:, :3].tobytes()
+    if sample_width == 4:
+        return (samples * np.iinfo(np.int32).max).astype("<i4").tobytes()
+    raise ValueError(f"unsupported sample width: {sample_width} bytes")
+
+
+class Sink(ABC):
+    """Destination of the rendered samples of a microphone, written block by block.
+
+    :param file_path: destination file.
+    :type file_path: str
+    :param num_channels: number of channels.
+    :type num_channels: int
+    :param sample_rate: sample rate [Hz].
+    :type sample_rate: int
+    :param sample_width: bytes per sample, when the format allows to choose it.
+    :type sample_width: int
+    :param num_samples: total number of frames that will be written.
+    :type num_samples: int
+    """
+
+    def __init__(self, file_path, num_channels, sample_rate, sample_width=4, num_samples=None):
+        _makedirs(file_path)
+        self.file_path = file_path
+        self.num_channels = num_channels
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.num_samples = num_samples
+
+    @abstractmethod
+    def write(self, samples):
+        """write the next block of samples, shape (N, num_channels).
+
+        :param samples: samples in [-1, 1].
+        :type samples: np.ndarray
+        """
+
+    def close(self):
+        pass
+
+
+class WaveSink(Sink):
+    """PCM WAV file, with 8, 16, 24 or 32 bit integer samples according to ``sample_width``."""
+
+    def __init__(self, file_path, num_channels, sample_rate, sample_width=4, num_samples=None):
+        super().__init__(file_path, num_channels, sample_rate, sample_width, num_samples)
+        if sample_width not in (1, 2, 3, 4):
+            raise ValueError(f"unsupported sample width: {sample_width} bytes")
+        self._wave_file = wave.open(file_path, mode="wb")
+        self._wave_file.setnchannels(num_channels)
+        self._wave_file.setsampwidth(sample_width)
+        self._wave_file.setframerate(sample_rate)
+
+    def write(self, samples):
+        self._wave_file.writeframes(encode_pcm(samples, self.sample_width))
+
+    def close(self):
+        self._wave_file.close()
+
+
+class FloatWaveSink(Sink):
+    """IEEE float32 WAV file (format tag 3), samples are not clipped."""
+    WAVE_FORMAT_IEEE_FLOAT = 3
+
+    def __init__(self, file_path, num_channels, sample_rate, sample_width=4, num_samples=None):
+        super().__init__(file_path, num_channels, sample_rate, 4, num_samples)
+        self._file = open(file_path, "wb")
+        self._data_size = 0
+        self._write_header()
+
+    def _write_header(self):
+        block_align = self.num_channels * 4
+        self._file.write(b"RIFF" + struct.pack("<I", 4 + 26 + 12 + 8 + self._data_size) + b"WAVE")
+        self._file.write(b"fmt " + struct.pack("<IHHIIHHH", 18, self.WAVE_FORMAT_IEEE_FLOAT, self.num_channels, self.sample_rate, self.sample_rate * block_align, block_align, 32, 0))
+        self._file.write(b"fact" + struct.pack("<II", 4, self._data_size // block_align))
+        self._file.write(b"data" + struct.pack("<I", self._data_size))
+
+    def write(self, samples):
+        data = np.asarray(samples, dtype="<f4").tobytes()
+        self._file.write(data)
+        self._data_size += len(data)
+
+    def close(self):
+        # sizes are only known at the end
+        self._file.seek(0)
+        self._write_header()
+        self._file.close()
+
+
+class NpySink(Sink):
+    """Memory-mapped ``.npy`` file of float32 samples with shape (num_samples, num_channels), which can be opened with
+    ``np.load(file_path, mmap_mode="r")`` without decoding."""
+
+    def __init__(self, file_path, num_channels, sample_rate, sample_width=4, num_samples=None):
+        super().__init__(file_path, num_channels, sample_rate, 4, num_samples)
+        if num_samples is None:
+            raise ValueError("the .npy output needs the number of samples in advance")
+        self._array = np.lib.format.open_memmap(file_path, mode="w+", dtype=np.float32, shape=(num_samples, num_channels))
+        self._position = 0
+
+    def write(self, samples):
+        self._array[self._position:self._position + len(samples)] = samples
+        self._position += len(samples)
+
+    def close(self):
+        self._array.flush()
+        del self._array
+
+
+class RawSink(Sink):
+    """Headerless file of interleaved little-endian float32 samples."""
+
+    def __init__(self, file_path, num_channels, sample_rate, sample_width=4, num_samples=None):
+        super().__init__(file_path, num_channels, sample_rate, 4, num_samples)
+        self._file = open(file_path, "wb")
+
+    def write(self, samples):
+        self._file.write(np.asarray(samples, dtype="<f4").tobytes())
+
+    def close(self):
+        self._file.close()
+
+
+SINKS = {
+    "wav": WaveSink,
+    "float_wav": FloatWaveSink,
+    "npy": NpySink,
+    "raw": RawSink,
+}
+
+
+def open_sink(microphone, num_samples):
+    """return the sink of the microphone: ``microphone.output`` is a key of ``SINKS``, a :class:`Sink` subclass or None
+    to choose it from the file extension (``.npy``, ``.raw``, WAV otherwise)."""
+    output = getattr(microphone, "output", None)
+    if output is None:
+        extension = os.path.splitext(microphone.file_path)[1].lower()
+        output = {".npy": "npy", ".raw": "raw"}.get(extension, "wav")
+    if isinstance(output, str):
+        if output not in SINKS:
+            raise ValueError(f"unknown output '{output}', available outputs: {', '.join(SINKS)}")
+        output = SINKS[output]
+    return output(microphone.file_path, microphone.num_channels, microphone.sample_rate, microphone.sample_width, num_samples)
@@ -0,0 +1,53 @@
+import queue
+import threading
+
+
+class BackgroundWriter:
+    """Hand blocks over to a sink running on a background thread, so that encoding and writing a block overlap with the
+    computation of the next one.
+
+    At most ``max_pending`` blocks wait in the queue: :meth:`write` blocks when the sink falls behind, which bounds the
+    memory to a few blocks regardless of the render duration.
+
+    :param sink: object providing ``write(samples)`` and ``close()``.
+    :param max_pending: number of blocks that can wait to be written.
+    :type max_pending: int
+    """
+
+    def __init__(self, sink, max_pending=2):
+        self.sink = sink
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            samples = self._queue.get()
+            if samples is None:
+                break
+            if self._error is None:
+                try:
+                    self.sink.write(samples)
+                except BaseException as error:
+                    self._error = error
+
+    def _check(self):
+        if self._error is not None:
+            raise self._error
+
+    def write(self, samples):
+        self._check()
+        self._queue.put(samples)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self.sink.close()
+        self._check()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,4 +1,5 @@
 from ._source import Source
 from ._white_noise import WhiteNoise
 from ._sine_wave import SineWave
-from ._audio_file import AudioFile
+from ._resampled import ResampledSource
+from ._audio_file import AudioFile, SignalCache, signal_cache
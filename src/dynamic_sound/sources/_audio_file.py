@@ -1,22 +1,274 @@
-
 from ._source import Source
+from ._resampled import ResampledSource
+from .._files import _atomic_save
+
+import os
+import struct
+import hashlib
+from collections import OrderedDict
 
-import librosa
 import numpy as np
 
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _wave_layout(filename):
+    """return (offset, num_frames, num_channels, sample_width, format_tag, sample_rate) of the data of a PCM or float
+    WAV file, or None when the file cannot be memory-mapped."""
+    with open(filename, "rb") as file:
+        header = file.read(12)
+        if len(header) < 12 or header[0:4] != b"RIFF" or header[8:12] != b"WAVE":
+            return None
+        fmt = None
+        while True:
+            chunk = file.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, chunk_size = chunk[0:4], struct.unpack("<I", chunk[4:8])[0]
+            if chunk_id == b"fmt ":
+                data = file.read(chunk_size)
+                format_tag, num_channels, sample_rate, _, _, bits = struct.unpack("<HHIIHH", data[0:16])
+                if format_tag == WAVE_FORMAT_EXTENSIBLE and len(data) >= 26:
+                    format_tag = struct.unpack("<H", data[24:26])[0]
+                fmt = (format_tag, num_channels, sample_rate, bits // 8)
+                file.seek(chunk_size % 2, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    return None
+                format_tag, num_channels, sample_rate, sample_width = fmt
+                supported = (format_tag == WAVE_FORMAT_PCM and sample_width in (1, 2, 3, 4)) or (format_tag == WAVE_FORMAT_IEEE_FLOAT and sample_width in (4, 8))
+                if not supported:
+                    return None
+                num_frames = min(chunk_size, os.path.getsize(filename) - file.tell()) // (num_channels * sample_width)
+                return file.tell(), num_frames, num_channels, sample_width, format_tag, sample_rate
+            else:
+                file.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+class _WaveMap:
+    """Memory-mapped view of the data of a PCM or float WAV file, decoded on access."""
+
+    def __init__(self, filename, layout):
+        self.filename = filename
+        self.offset, self.length, self.num_channels, self.sample_width, self.format_tag, self.sample_rate = layout
+        self._data = None
+
+    def _map(self):
+        if self._data is None:
+            if self.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+                dtype = "<f4" if self.sample_width == 4 else "<f8"
+            else:
+                dtype = {1: np.uint8, 2: "<i2", 3: np.uint8, 4: "<i4"}[self.sample_width]
+            shape = (self.length, self.num_channels, 3) if self.sample_width == 3 else (self.length, self.num_channels)
+            self._data = np.memmap(self.filename, dtype=dtype, mode="r", offset=self.offset, shape=shape)
+        return self._data
+
+    def __getitem__(self, indices):
+        # same scaling as soundfile, then mono mix down as librosa
+        frames = self._map()[indices]
+        if self.format_tag == WAVE_FORMAT_IEEE_FLOAT:
+            frames = frames.astype(np.float32)
+        elif self.sample_width == 1:
+            frames = (frames.astype(np.float32) - 128) / 128
+        elif self.sample_width == 3:
+            frames = frames.astype(np.int32)
+            frames = ((frames[..., 0] << 8) | (frames[..., 1] << 16) | (frames[..., 2] << 24)).astype(np.float32) / 2**31
+        else:
+            frames = frames.astype(np.float32) / 2**(8 * self.sample_width - 1)
+        return frames[..., 0] if self.num_channels == 1 else frames.mean(axis=-1)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_data"] = None
+        return state
+
+
+class _WindowReader:
+    """Decode a file with soundfile in windows of ``window_size`` frames, keeping the last ``max_windows`` ones."""
+
+    def __init__(self, filename, window_size, max_windows):
+        import soundfile
+
+        self.filename = filename
+        self.window_size = window_size
+        self.max_windows = max_windows
+        info = soundfile.info(filename)
+        self.length = info.frames
+        self.sample_rate = info.samplerate
+        self._file = None
+        self._windows = OrderedDict()
+
+    def _window(self, window_index):
+        window = self._windows.get(window_index)
+        if window is None:
+            import soundfile
+
+            if self._file is None:
+                self._file = soundfile.SoundFile(self.filename)
+            self._file.seek(window_index * self.window_size)
+            frames = self._file.read(self.window_size, dtype="float32", always_2d=True)
+            window = frames[:, 0] if frames.shape[1] == 1 else frames.mean(axis=1)
+            self._windows[window_index] = window
+            if len(self._windows) > self.max_windows:
+                self._windows.popitem(last=False)
+        else:
+            self._windows.move_to_end(window_index)
+        return window
+
+    def __getitem__(self, indices):
+        indices = np.asarray(indices)
+        values = np.empty(indices.shape, dtype=np.float32)
+        window_indices = indices // self.window_size
+        for window_index in np.unique(window_indices):
+            selected = window_indices == window_index
+            values[selected] = self._window(int(window_index))[indices[selected] - window_index * self.window_size]
+        return values if values.ndim else values[()]
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_file"] = None
+        state["_windows"] = OrderedDict()
+        return state
+
+
+class SignalCache:
+    """Process-wide cache of the signals decoded (and resampled) by :class:`AudioFile`, shared by all the sources and
+    simulations reading the same file.
+
+    Signals are keyed by file, modification time, sample rate and gain, the least recently used ones being dropped
+    beyond ``max_bytes``. With a ``cache_dir``, the resampled signals are also stored on disk, so that other processes
+    and later runs do not decode them again. The cached signals are read-only.
+
+    :param max_bytes: memory bound of the cached signals [B].
+    :type max_bytes: int
+    :param cache_dir: optional directory where the resampled signals are stored across runs.
+    :type cache_dir: str
+    """
+
+    def __init__(self, max_bytes=1 << 30, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.nbytes = 0
+        self._signals = OrderedDict()
+
+    def load(self, filename, sample_rate=None, gain_db=0.0, cache_dir=None):
+        """return the (signal, sample_rate) of a file decoded as ``librosa.load(filename, sr=sample_rate)`` and scaled
+        by ``gain_db``, from the cache when possible.
+
+        :param cache_dir: directory of the on-disk cache, ``self.cache_dir`` by default.
+        :type cache_dir: str
+        """
+        stat = os.stat(filename)
+        file_key = (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size, sample_rate)
+        key = (*file_key, gain_db)
+        entry = self._signals.get(key)
+        if entry is not None:
+            self._signals.move_to_end(key)
+            return entry
+
+        signal, sample_rate = self._decode(filename, file_key, self.cache_dir if cache_dir is None else cache_dir)
+        if gain_db != 0.0:
+            signal = signal * 10**(gain_db / 20.0)
+        signal.flags.writeable = False
+        entry = self._signals[key] = (signal, sample_rate)
+        self.nbytes += signal.nbytes
+        while self.nbytes > self.max_bytes and len(self._signals) > 1:
+            self.nbytes -= self._signals.popitem(last=False)[1][0].nbytes
+        return entry
+
+    def clear(self):
+        self._signals.clear()
+        self.nbytes = 0
+
+    def _decode(self, filename, file_key, cache_dir):
+        cache_file = None
+        if cache_dir is not None:
+            digest = hashlib.sha1(repr(file_key).encode()).hexdigest()[:16]
+            cache_file = os.path.join(cache_dir, f"signal_{digest}.npz")
+            if os.path.isfile(cache_file):
+                with np.load(cache_file) as data:
+                    return data["signal"], data["sample_rate"].item()
+
+        import librosa
+
+        signal, sample_rate = librosa.load(filename, sr=file_key[3], mono=True)
+        if cache_file is not None:
+            _atomic_save(cache_file, lambda file: np.savez(file, signal=signal, sample_rate=sample_rate))
+        return signal, sample_rate
+
+
+signal_cache = SignalCache()
+
+
 class AudioFile(Source):
-    def __init__(self, filename, sample_rate=None, gain_db=0.0, loop=True):
+    """Audio file source, mixed down to mono.
+
+    By default the whole file is decoded (and resampled to ``sample_rate``) at construction. With ``stream=True`` the
+    file is read on demand instead: PCM and float WAV files are memory-mapped, other formats are decoded by windows of
+    ``window_size`` frames, keeping the ``max_windows`` most recent ones. Streaming reads the file at its own sample
+    rate: when ``sample_rate`` differs the file is decoded and resampled at construction.
+
+    Decoded signals are shared through :data:`signal_cache`: sources reading the same file at the same sample rate and
+    gain decode it once per process, or once overall with a ``cache_dir``.
+
+    :param cache_dir: optional directory where the resampled signal is stored across runs, see :class:`SignalCache`.
+    :type cache_dir: str
+    """
+
+    def __init__(self, filename, sample_rate=None, gain_db=0.0, loop=True, stream=False, window_size=65_536, max_windows=16, cache_dir=None):
         super().__init__()
-        self.signal, self.sample_rate = librosa.load(filename, sr=sample_rate, mono=True)
+        self.filename = filename
         self.loop = loop
-        self.length = len(self.signal)
-        if gain_db != 0.0:
-            self.signal = self.signal * 10**(gain_db / 20.0)
+        self.gain = 10**(gain_db / 20.0)
+        self._signal = None
+        self._reader = None
+
+        if stream:
+            layout = _wave_layout(filename)
+            reader = _WaveMap(filename, layout) if layout is not None else _WindowReader(filename, window_size, max_windows)
+            if sample_rate is None or sample_rate == reader.sample_rate:
+                self._reader = reader
+                self.sample_rate = reader.sample_rate
+                self.length = reader.length
+
+        if self._reader is None:
+            self._signal, self.sample_rate = signal_cache.load(filename, sample_rate, gain_db, cache_dir)
+            self.length = len(self._signal)
+
+    @property
+    def signal(self):
+        """decoded signal, read entirely from the file when the source is streamed."""
+        if self._signal is not None:
+            return self._signal
+        return self._frames(np.arange(self.length))
+
+    def _frames(self, indices):
+        if self._signal is not None:
+            return self._signal[indices]
+        frames = self._reader[indices]
+        return frames * self.gain if self.gain != 1.0 else frames
 
     def get_sample(self, time:float):
         time_int = int(time * self.sample_rate)
         if self.loop == False and time_int >= self.length-1:
             return 0.0
-        
+
         time_frac = time * self.sample_rate - time_int
-        return (1.0 - time_frac) * self.signal[time_int % self.length] + time_frac * self.signal[(time_int + 1) % self.length]
+        return (1.0 - time_frac) * self._frames(time_int % self.length) + time_frac * self._frames((time_int + 1) % self.length)
+
+    def get_samples(self, times:np.ndarray) -> np.ndarray:
+        position = np.asarray(times, dtype=np.float64) * self.sample_rate
+        time_int = np.trunc(position).astype(np.int64)
+        time_frac = position - time_int
+        samples = (1.0 - time_frac) * self._frames(time_int % self.length) + time_frac * self._frames((time_int + 1) % self.length)
+        if self.loop == False:
+            samples[time_int >= self.length-1] = 0.0
+        return samples
+
+    def prepare(self, sample_rate):
+        # streamed files are not converted, which would decode them entirely
+        if sample_rate == self.sample_rate or self._signal is None:
+            return self
+        return ResampledSource(self, sample_rate, loop=self.loop)
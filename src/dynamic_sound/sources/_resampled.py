@@ -0,0 +1,78 @@
+from ._source import Source
+
+from fractions import Fraction
+
+import numpy as np
+
+MAX_DENOMINATOR = 1_000  # bound of the up and down factors of the polyphase resampler
+
+
+def resample(signal, source_rate, target_rate, loop=False):
+    """return (signal, sample_rate) of ``signal`` resampled from ``source_rate`` to about ``target_rate`` with a
+    polyphase filter.
+
+    The conversion ratio is approximated by a fraction ``up / down`` with ``down <= MAX_DENOMINATOR``: the returned
+    sample rate is the exact ``source_rate * up / down``. A looping signal is resampled as a periodic one, and the
+    returned signal has one more period of samples than needed, so that interpolation never reads past its end.
+    """
+    from scipy.signal import resample_poly
+
+    ratio = Fraction(target_rate / source_rate).limit_denominator(MAX_DENOMINATOR)
+    up, down = ratio.numerator, ratio.denominator
+    sample_rate = source_rate * up / down
+    length = int(np.ceil(len(signal) * up / down)) + 2
+
+    signal = np.asarray(signal, dtype=np.float64)
+    if not loop:
+        resampled = resample_poly(np.concatenate([signal, np.zeros(-(-2 * down // up))]), up, down)
+        return resampled[:length], sample_rate
+
+    # the anti-aliasing filter spans 10 * max(up, down) samples on each side at the upsampled rate, the padding is a
+    # multiple of down input samples so that the output is aligned on the original first sample
+    pad = down * int(np.ceil((10 * max(up, down) / up + 2) / down))
+    periods = int(np.ceil(pad / len(signal)))
+    tiled = np.tile(signal, 2 * periods + 1)
+    start = periods * len(signal) - pad
+    padded = tiled[start:start + len(signal) + 2 * pad]
+    resampled = resample_poly(padded, up, down)
+    offset = pad * up // down
+    return resampled[offset:offset + length], sample_rate
+
+
+class ResampledSource(Source):
+    """Sampled source converted once to the render rate, see :meth:`Source.prepare`.
+
+    Samples are read from the resampled table with linear interpolation: with a table at (or above) the microphone
+    sample rate, the interpolation no longer aliases the content above the microphone Nyquist frequency.
+
+    :param source: prepared source, providing ``signal`` and ``sample_rate``.
+    :type source: Source
+    :param sample_rate: rate of the table [Hz], the source rate is approximated as described in :func:`resample`.
+    :type sample_rate: float
+    :param loop: whether the signal repeats after its end, or is silent.
+    :type loop: bool
+    """
+
+    def __init__(self, source, sample_rate, loop=False):
+        super().__init__()
+        self.loop = loop
+        self.duration = len(source.signal) / source.sample_rate
+        self.signal, self.sample_rate = resample(source.signal, source.sample_rate, sample_rate, loop=loop)
+        self.length = len(self.signal)
+
+    def get_sample(self, time:float):
+        return float(self.get_samples(np.array([time]))[0])
+
+    def get_samples(self, times:np.ndarray) -> np.ndarray:
+        times = np.asarray(times, dtype=np.float64)
+        if self.loop:
+            times = times % self.duration
+        position = times * self.sample_rate
+        time_int = np.floor(position).astype(np.int64)
+        time_frac = position - time_int
+        valid = (time_int >= 0) & (time_int < self.length - 1)
+        if not self.loop:
+            valid &= times < self.duration
+        time_int = np.where(valid, time_int, 0)
+        samples = (1.0 - time_frac) * self.signal[time_int] + time_frac * self.signal[time_int + 1]
+        return np.where(valid, samples, 0.0)
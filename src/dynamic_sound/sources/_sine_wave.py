@@ -12,3 +12,5 @@ class SineWave(Source):
     def get_sample(self, time:float):
         return self.amplitude * np.sin(2 * np.pi * self.frequency * time)
 
+    def get_samples(self, times:np.ndarray) -> np.ndarray:
+        return self.amplitude * np.sin(2 * np.pi * self.frequency * np.asarray(times, dtype=np.float64))
@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
 
+import numpy as np
+
 class Source(ABC):
 
     @abstractmethod
@@ -14,4 +16,21 @@ class Source(ABC):
         :type time: float
         """
 
+    def get_samples(self, times:np.ndarray) -> np.ndarray:
+        """return the sample values at the specified time instants. The default implementation calls :meth:`get_sample` for each time instant, sources should override it with a vectorized implementation.
+
+        :param times: time instants of the requested signal samples.
+        :type times: np.ndarray
+        """
+        return np.array([self.get_sample(time) for time in times], dtype=np.float64)
+
+    def prepare(self, sample_rate):
+        """return the source read by a render at ``sample_rate``, called once per source and rate before rendering.
+
+        Sampled sources return a copy converted to ``sample_rate`` (see :class:`ResampledSource`), so that reading
+        them between their samples does not alias. The default implementation returns the source itself.
 
+        :param sample_rate: rate at which the source is read [Hz].
+        :type sample_rate: float
+        """
+        return self
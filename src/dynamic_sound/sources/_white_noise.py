@@ -1,4 +1,5 @@
 from ._source import Source
+from ._resampled import ResampledSource
 
 import numpy as np
 
@@ -13,3 +14,12 @@ class WhiteNoise(Source):
         time_frac = time * self.sample_rate - time_int
         return (1.0 - time_frac) * self.signal[time_int] + time_frac * self.signal[time_int + 1]
     
+
+    def get_samples(self, times:np.ndarray) -> np.ndarray:
+        position = np.asarray(times, dtype=np.float64) * self.sample_rate
+        time_int = np.trunc(position).astype(np.int64)
+        time_frac = position - time_int
+        return (1.0 - time_frac) * self.signal[time_int] + time_frac * self.signal[time_int + 1]
+
+    def prepare(self, sample_rate):
+        return self if sample_rate == self.sample_rate else ResampledSource(self, sample_rate)
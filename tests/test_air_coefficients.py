@@ -1,5 +1,6 @@
 import os
 import numpy as np
+import pytest
 import dynamic_sound as ds
 
 res_path = os.path.join("examples", "resources")
@@ -32,5 +33,48 @@ def test_air_coefficients():
         
         print()
 
+def test_filter_bank():
+    air = ds.environment.Air(temperature=20, pressure=1, relative_humidity=50)
+    bank = ds.acoustics.absorption.filter_bank(48_000, air, distance_step=2.0, cache_dir="tests/_tmp/filters")
+    assert bank is ds.acoustics.absorption.filter_bank(48_000, air, distance_step=2.0, cache_dir="tests/_tmp/filters")
+
+    assert np.array_equal(bank.filter(10.0), bank.design(10.0))
+    assert np.allclose(bank.filter(11.0), 0.5 * (bank.design(10.0) + bank.design(12.0)))
+    assert np.allclose(bank.filter(11.0), bank.design(11.0), atol=1e-3)
+
+    bank.save()
+    reloaded = ds.acoustics.absorption.FilterBank(48_000, 20, 50, 1, distance_step=2.0, cache_dir="tests/_tmp/filters")
+    assert np.array_equal(reloaded.grid_filter(5), bank.grid_filter(5))
+
+    with pytest.raises(ValueError):
+        ds.acoustics.absorption.FilterBank(48_000, 20, 50, 1, distance_step=0.0)
+    with pytest.raises(ValueError):
+        ds.Simulation(distance_step=-1.0)
+
+
+def test_absorption_table():
+    standard = ds.acoustics.standards.ISO_9613_1_1993
+    table = ds.acoustics.absorption.AbsorptionTable(temperature_range=(-10, 40), relative_humidity_range=(10, 100), pressure_range=(0.9, 1.1))
+    freq = np.linspace(0, 24_000, 512)
+    for temp, hum, pres in ((20.0, 50.0, 1.0), (21.3, 47.7, 0.987), (-3.25, 88.1, 1.042)):
+        exact = standard.attenuation_coefficients(frequency=freq, temperature=temp + 273.15, relative_humidity=hum, pressure=pres * 101.325)
+        assert np.allclose(table.coefficients(freq, temp, hum, pres), exact, rtol=1e-3, atol=0)
+
+    # tabulated and exact filters are not cached in the same file
+    tabulated = ds.acoustics.absorption.FilterBank(48_000, 20, 50, 1, cache_dir="tests/_tmp/filters", table=table)
+    assert tabulated.cache_file != ds.acoustics.absorption.FilterBank(48_000, 20, 50, 1, cache_dir="tests/_tmp/filters").cache_file
+
+    index = table.grid_index(21.3, 47.7, 0.987)
+    assert table.grid_conditions(index) == (21.5, 48.0, 0.99)
+
+    air = ds.environment.Air(temperature=20, pressure=1, relative_humidity=50, timeline=[[0.0, 10.0, 1.0, 20.0], [2.0, 30.0, 1.0, 80.0]])
+    assert air.varying
+    temp, pres, hum = air.get_conditions([-1.0, 1.0, 3.0])
+    assert np.allclose(temp, [10.0, 20.0, 30.0]) and np.allclose(hum, [20.0, 50.0, 80.0]) and np.allclose(pres, 1.0)
+    assert np.allclose(air.get_sound_speed([1.0]), standard.sound_speed(293.15))
+
+
 if __name__ == "__main__":
     test_air_coefficients()
+    test_filter_bank()
+    test_absorption_table()
@@ -0,0 +1,53 @@
+import os
+import shutil
+import filecmp
+import numpy as np
+import dynamic_sound as ds
+
+tmp_path = os.path.join("tests", "_tmp", "batch")
+
+
+def build_scene(params, rng, sources, output_dir):
+    sim = ds.Simulation(temperature=params["temperature"], pressure=1, relative_humidity=50)
+    sim.add_microphone(path=ds.Path([
+            [0.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0],
+            [2.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0]
+        ]), microphone=ds.microphones.Hedraphone_v2(file_path=os.path.join(output_dir, "hedraphone.wav"), sample_rate=100, rnd_angle=5.0)
+    )
+    start = rng.uniform(-20.0, 20.0, 3)
+    sim.add_source(path=ds.Path([
+            [0.0, *start, 1.0, 0.0, 0.0, 0.0],
+            [2.0, *(-start), 1.0, 0.0, 0.0, 0.0]
+        ]), source=sources["noise"]
+    )
+    return sim
+
+
+def test_batch():
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    sources = {"noise": ds.sources.WhiteNoise(duration=3.0, sample_rate=100)}
+    scenes = [{"temperature": temperature} for temperature in (0, 10, 20)] + [{"name": "hot", "temperature": 40}]
+
+    entries = ds.run_batch(scenes, build_scene, os.path.join(tmp_path, "a"), workers=2, sources=sources, seed=1)
+    assert sorted(entry["name"] for entry in entries) == ["hot", "scene_000000", "scene_000001", "scene_000002"]
+    assert all(entry["status"] == "done" for entry in entries)
+    assert all(os.path.isfile(output) for entry in entries for output in entry["outputs"])
+
+    # finished scenes are skipped when the batch is resumed, the random state of the caller is kept
+    np.random.seed(0)
+    assert ds.run_batch(scenes + [{"temperature": 30}], build_scene, os.path.join(tmp_path, "a"), sources=sources, seed=1)[0]["name"] == "scene_000004"
+    assert np.random.random() == np.random.RandomState(0).random()
+    assert len(ds.read_manifest(os.path.join(tmp_path, "a"))) == 5
+
+    # every scene is reproducible from its seed, regardless of the worker running it
+    calls = []
+    ds.run_batch(scenes, build_scene, os.path.join(tmp_path, "b"), workers=1, sources=sources, seed=1, signal_cache_dir=os.path.join(tmp_path, "signals"),
+                 progress=lambda entry, done, total: calls.append((entry["name"], done, total)))
+    assert calls == [("scene_000000", 1, 4), ("scene_000001", 2, 4), ("scene_000002", 3, 4), ("hot", 4, 4)]
+    assert ds.sources.signal_cache.cache_dir is None
+    for name in ("scene_000001", "hot"):
+        assert filecmp.cmp(os.path.join(tmp_path, "a", name, "hedraphone.wav"), os.path.join(tmp_path, "b", name, "hedraphone.wav"), shallow=False)
+
+
+if __name__ == "__main__":
+    test_batch()
@@ -0,0 +1,54 @@
+import numpy as np
+import dynamic_sound as ds
+from dynamic_sound._emission import EmissionSolver, EmissionTracker
+
+
+def test_emission_solver():
+    path = ds.Path([
+        [0.0, 3.0, 20.0, 1.0,      1.0, 0.0, 0.0, 0.0],
+        [4.0, 3.0, 0.0, 5.0,       1.0, 0.0, 0.0, 0.0],
+        [8.0, 3.0, -20.0, 1.0,     1.0, 0.0, 0.0, 0.0]
+    ])
+    rng = np.random.default_rng(0)
+    times = np.linspace(-1.0, 9.0, 200)
+    positions = rng.uniform(-5.0, 5.0, (len(times), 3))
+
+    solver = EmissionSolver(path)
+    times_emission, positions_emission = solver.solve(times, positions)
+
+    for time_receiver, position_receiver, time_emission, position_emission in zip(times, positions, times_emission, positions_emission):
+        expected_time, expected_position = ds.Simulation._compute_emission(position_receiver, time_receiver, path)
+        if expected_time is None:
+            assert np.isnan(time_emission)
+            assert np.isnan(position_emission).all()
+        else:
+            assert np.isclose(time_emission, expected_time)
+            assert np.allclose(position_emission, expected_position)
+
+
+def test_emission_tracker():
+    times_path = np.linspace(0.0, 20.0, 2_001)
+    path = ds.Path(np.column_stack([
+        times_path, 30.0 * np.cos(times_path), 30.0 * np.sin(times_path), np.full_like(times_path, 5.0),
+        np.ones_like(times_path), np.zeros_like(times_path), np.zeros_like(times_path), np.zeros_like(times_path)
+    ]))
+    times = np.arange(0, 2_000) / 100
+    positions = np.column_stack([times, np.zeros_like(times), np.ones_like(times)])
+
+    solver = EmissionSolver(path)
+    tracker = EmissionTracker(solver)
+    expected_times, expected_positions = solver.solve(times, positions)
+    for block in range(0, len(times), 256):
+        times_emission, positions_emission = tracker.solve(times[block:block+256], positions[block:block+256])
+        assert np.array_equal(times_emission, expected_times[block:block+256], equal_nan=True)
+        assert np.array_equal(positions_emission, expected_positions[block:block+256], equal_nan=True)
+
+    # an invalid cursor falls back to the full search
+    tracker.segment = solver.num_segments - 1
+    times_emission, _ = tracker.solve(times[:256], positions[:256])
+    assert np.array_equal(times_emission, expected_times[:256], equal_nan=True)
+
+
+if __name__ == "__main__":
+    test_emission_solver()
+    test_emission_tracker()
@@ -0,0 +1,32 @@
+import sys
+import json
+import subprocess
+
+HEAVY_MODULES = ["scipy.signal", "scipy.interpolate", "scipy.spatial", "librosa", "numba", "tqdm", "matplotlib"]
+IMPORT_BUDGET = 1.0  # [s], numpy alone takes about a tenth of it
+
+SCRIPT = """
+import sys, json, time
+start = time.perf_counter()
+import dynamic_sound
+print(json.dumps({"time": time.perf_counter() - start, "modules": sorted(sys.modules)}))
+"""
+
+
+def import_package():
+    result = subprocess.run([sys.executable, "-c", SCRIPT], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def test_import_time():
+    results = [import_package() for _ in range(3)]
+    loaded = [name for name in HEAVY_MODULES if name in results[0]["modules"]]
+    assert loaded == [], f"imported by dynamic_sound: {loaded}"
+
+    import_time = min(result["time"] for result in results)
+    print(f"import time: {import_time:.3f} s")
+    assert import_time < IMPORT_BUDGET
+
+
+if __name__ == "__main__":
+    test_import_time()
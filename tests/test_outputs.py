@@ -0,0 +1,49 @@
+import numpy as np
+import soundfile
+import dynamic_sound as ds
+
+microphone_sample_rate = 100
+
+
+def _render(microphone):
+    sim = ds.Simulation(temperature=20, pressure=1, relative_humidity=50)
+    sim.add_microphone(path=ds.Path([
+            [0.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0],
+            [4.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0]
+        ]), microphone=microphone
+    )
+    sim.add_source(path=ds.Path([
+            [0.0, 3.0, 2.0, 1.0, 1.0, 0.0, 0.0, 0.0],
+            [4.0, 3.0, -2.0, 1.0, 1.0, 0.0, 0.0, 0.0]
+        ]), source=ds.sources.SineWave(frequency=10, amplitude=1.0)
+    )
+    sim.run()
+
+
+def test_outputs():
+    _render(ds.microphones.Hedraphone_v1(file_path="tests/_tmp/output_int32.wav", sample_rate=microphone_sample_rate))
+    reference, _ = soundfile.read("tests/_tmp/output_int32.wav")
+
+    for sample_width, subtype, atol in ((2, "PCM_16", 1e-4), (3, "PCM_24", 1e-6)):
+        _render(ds.microphones.Hedraphone_v1(file_path=f"tests/_tmp/output_{subtype}.wav", sample_rate=microphone_sample_rate, sample_width=sample_width))
+        assert soundfile.info(f"tests/_tmp/output_{subtype}.wav").subtype == subtype
+        samples, _ = soundfile.read(f"tests/_tmp/output_{subtype}.wav")
+        assert np.allclose(samples, reference, atol=atol)
+
+    _render(ds.microphones.Hedraphone_v1(file_path="tests/_tmp/output_float.wav", sample_rate=microphone_sample_rate, output="float_wav"))
+    assert soundfile.info("tests/_tmp/output_float.wav").subtype == "FLOAT"
+    samples, _ = soundfile.read("tests/_tmp/output_float.wav")
+    assert np.allclose(samples, reference, atol=1e-6)
+
+    _render(ds.microphones.Hedraphone_v1(file_path="tests/_tmp/output.npy", sample_rate=microphone_sample_rate))
+    samples = np.load("tests/_tmp/output.npy", mmap_mode="r")
+    assert samples.dtype == np.float32
+    assert np.allclose(samples, reference, atol=1e-6)
+
+    _render(ds.microphones.Hedraphone_v1(file_path="tests/_tmp/output.f32", sample_rate=microphone_sample_rate, output="raw"))
+    samples = np.fromfile("tests/_tmp/output.f32", dtype="<f4").reshape(-1, reference.shape[1])
+    assert np.allclose(samples, reference, atol=1e-6)
+
+
+if __name__ == "__main__":
+    test_outputs()
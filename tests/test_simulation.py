@@ -1,4 +1,10 @@
 import os
+import time
+import wave
+import filecmp
+import numpy as np
+import pytest
+from scipy.spatial.transform import Rotation, Slerp
 import dynamic_sound as ds
 
 res_path = os.path.join("examples", "resources")
@@ -115,9 +121,436 @@ def test_path():
     assert rotation is None
 
 
+def test_path_storage():
+    import pickle
+
+    rng = np.random.default_rng(0)
+    positions = np.column_stack([np.arange(1_000) * 0.01, rng.standard_normal((1_000, 3)), Rotation.random(1_000, random_state=0).as_quat(scalar_first=True)])
+    path = ds.Path(positions)
+    for file_name in ("path.csv", "path.npy", "path.npz"):
+        path.save_path(f"tests/_tmp/{file_name}")
+        assert np.array_equal(ds.Path(file=f"tests/_tmp/{file_name}").positions, positions)
+
+    # the format is detected from the content
+    os.replace("tests/_tmp/path.npy", "tests/_tmp/path_npy.path")
+    loaded = ds.Path(file="tests/_tmp/path_npy.path", mmap=True)
+    assert isinstance(loaded.positions, np.memmap)
+    assert np.array_equal(loaded.positions, positions)
+    assert loaded.duration == path.duration
+
+    # memory-mapped paths are pickled as a reference to their file
+    data = pickle.dumps(loaded)
+    assert len(data) < positions.nbytes // 10
+    unpickled = pickle.loads(data)
+    assert np.array_equal(unpickled.positions, positions)
+    assert np.allclose(unpickled.get_positions([1.234])[0], path.get_positions([1.234])[0])
+
+
+def test_path_simplify():
+    rng = np.random.default_rng(0)
+    times = np.arange(2_000) / 100
+    points = np.column_stack([10 * np.cos(times / 5), 10 * np.sin(times / 5), 1e-4 * rng.standard_normal(len(times))])
+    rotations = Rotation.from_euler("z", times[:, None] / 5) * Rotation.from_rotvec(1e-4 * rng.standard_normal((len(times), 3)))
+    positions = np.column_stack([times, points, rotations.as_quat(scalar_first=True)])
+
+    original = ds.Path(positions)
+    path = ds.Path(positions)
+    position_error, angle_error = path.simplify(max_position_error=0.01, max_angle_error=0.5)
+    assert len(path.positions) < len(positions) / 10
+    assert position_error <= 0.01 and angle_error <= 0.5
+    assert path.duration == original.duration
+
+    position, rotation = path.get_positions(times[:-1])
+    assert np.linalg.norm(position - points[:-1], axis=1).max() <= 0.01 + 1e-9
+    angles = (Rotation.from_quat(rotation, scalar_first=True).inv() * rotations[:-1]).magnitude()
+    assert np.degrees(angles).max() <= 0.5 + 1e-9
+
+    # the rendered audio does not change beyond the tolerance
+    outputs = []
+    for source_path in (original, path):
+        sim = ds.Simulation(temperature=20, pressure=1, relative_humidity=50)
+        sim.add_microphone(path=ds.Path([
+                [1.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0],
+                [19.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0]
+            ]), microphone=ds.microphones.Microphone(file_path="tests/_tmp/simplify.npy", sample_rate=200)
+        )
+        sim.add_source(path=source_path, source=ds.sources.SineWave(frequency=20, amplitude=1.0))
+        sim.run(progress=False)
+        outputs.append(np.load("tests/_tmp/simplify.npy"))
+    assert np.allclose(outputs[0], outputs[1], atol=1e-3)
+
+
+def test_path_positions():
+    path = ds.Path([
+        [0.0,     0.0, 0.0, 0.0,       0.0, 0.0, 0.0, 1.0],
+        [5.0,     10.0, 0.0, 10.0,     0.0, 0.0, 0.2588, 0.9659],
+        [8.0,     40.0, 20.0, 30.0,    0.2588, 0.2588, 0.2588, 0.9239],
+        [12.0,    10.0, 0.0, 10.0,     0.0, 0.0, 0.9848, -0.1736]
+    ])
+    times = np.linspace(-1.0, 13.0, 300)
+    positions, rotations = path.get_positions(times)
+
+    outside = (times < 0.0) | (times >= 12.0)
+    assert np.isnan(positions[outside]).all() and np.isnan(rotations[outside]).all()
+
+    for time, position, rotation in zip(times[~outside], positions[~outside], rotations[~outside]):
+        i = np.searchsorted(path.positions[:, 0], time, side="right") - 1
+        alpha = (time - path.positions[i, 0]) / (path.positions[i + 1, 0] - path.positions[i, 0])
+        key_rots = Rotation.from_quat(path.positions[i:i + 2, 4:8], scalar_first=True)
+        assert np.allclose(position, path.positions[i, 1:4] + alpha * (path.positions[i + 1, 1:4] - path.positions[i, 1:4]))
+        assert np.allclose(rotation, Slerp([0, 1], key_rots)([alpha])[0].as_quat(scalar_first=True))
+
+    # keyframes are refreshed when the waypoints are assigned, or on request after an in place change
+    positions = path.positions.copy()
+    path.positions[:, 4:8] = [1.0, 0.0, 0.0, 0.0]
+    path.reset_keyframes()
+    assert np.allclose(path.get_positions(times[~outside])[1], [1.0, 0.0, 0.0, 0.0])
+    path.positions = positions
+    assert not np.allclose(path.get_positions(times[~outside])[1], [1.0, 0.0, 0.0, 0.0])
+
+
+def _read_wav(file_path):
+    with wave.open(file_path) as wave_file:
+        samples = np.frombuffer(wave_file.readframes(wave_file.getnframes()), dtype="<i4")
+        return samples.reshape(-1, wave_file.getnchannels()) / np.iinfo(np.int32).max
+
+
+_STATIC_PATH = [[0.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0], [1.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0]]
+_MOVING_PATH = [[0.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0], [1.0, 1.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0]]
+
+
+def _sine_source(frequency, x, start=0.0, amplitude=1.0):
+    # sine wave moving from x to 3 * x along the x axis, until t = 1 s
+    return [[start, x, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0], [1.0, 3 * x, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0]], ds.sources.SineWave(frequency=frequency, amplitude=amplitude)
+
+
+def _scene(file_path, microphone=ds.microphones.Microphone, microphone_path=_STATIC_PATH, sources=None, sample_rate=2_000, **sim_kwargs):
+    # simulation of a microphone (its class, or the channel positions of a MicrophoneArray) and of (path, source) pairs
+    sim = ds.Simulation(**sim_kwargs)
+    if isinstance(microphone, type):
+        microphone = microphone(file_path=file_path, sample_rate=sample_rate)
+    else:
+        microphone = ds.microphones.MicrophoneArray(positions=microphone, file_path=file_path, sample_rate=sample_rate)
+    sim.add_microphone(path=ds.Path(microphone_path), microphone=microphone)
+    for source_path, source in sources if sources is not None else [_sine_source(200, 10.0)]:
+        sim.add_source(path=ds.Path(source_path), source=source)
+    return sim
+
+
+def test_microphone_world_poses():
+    positions = np.array([[0.1, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0], [0.0, 0.2, 0.0, 0.0, 0.0, 0.0, 0.0], [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 1.0]])
+    mic = ds.microphones.MicrophoneArray(os.path.join("tests", "_tmp", "poses.wav"), positions, sample_rate=microphone_sample_rate)
+    array_positions = np.array([[1.0, 2.0, 3.0], [np.nan] * 3, [-1.0, 0.0, 5.0]])
+    rotations = Rotation.random(3, random_state=0)
+    array_rotations = rotations.as_quat(scalar_first=True)
+
+    world_positions = mic.get_world_positions(array_positions, array_rotations)
+    assert world_positions.shape == (3, 3, 3)
+    assert np.isnan(world_positions[:, 1]).all()
+    for channel in range(3):
+        for index in (0, 2):
+            expected = array_positions[index] + rotations[index].apply(positions[channel, 0:3])
+            assert np.allclose(world_positions[channel, index], expected)
+
+
+def test_simulation_fft_engine():
+    outputs = {}
+    for engine in ("reference", "fft"):
+        sim = ds.Simulation(temperature=20, pressure=1, relative_humidity=50, engine=engine, block_size=256, hop=64)
+        sim.add_microphone(path=ds.Path([
+                [0.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0],
+                [2.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0]
+            ]), microphone=ds.microphones.Microphone(file_path=f"tests/_tmp/{engine}_engine.wav", sample_rate=2_000)
+        )
+        sim.add_source(path=ds.Path([
+                [0.0, 10.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0],
+                [2.0, 30.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0]
+            ]), source=ds.sources.SineWave(frequency=200, amplitude=1.0)
+        )
+        sim.run()
+        outputs[engine] = _read_wav(f"tests/_tmp/{engine}_engine.wav")
+
+    assert outputs["reference"].shape == outputs["fft"].shape
+    assert np.allclose(outputs["reference"], outputs["fft"], atol=1e-3)
+
+    with pytest.raises(ValueError):
+        ds.Simulation(engine="unknown")
+    with pytest.raises(ValueError):
+        ds.Simulation(engine="fft", block_size=100, hop=64)
+
+
+def test_simulation_jit_engine():
+    outputs = {}
+    for engine in ("reference", "jit"):
+        sim = ds.Simulation(temperature=20, pressure=1, relative_humidity=50, engine=engine, chunk_size=300)
+        sim.add_microphone(path=ds.Path([
+                [0.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0],
+                [1.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0]
+            ]), microphone=ds.microphones.Microphone(file_path=f"tests/_tmp/{engine}_engine.npy", sample_rate=2_000)
+        )
+        for frequency, y in ((200, 10.0), (310, -4.0)):
+            sim.add_source(path=ds.Path([
+                    [0.0, y, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0],
+                    [1.0, 3 * y, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0]
+                ]), source=ds.sources.SineWave(frequency=frequency, amplitude=1.0)
+            )
+        sim.run()
+        outputs[engine] = np.load(f"tests/_tmp/{engine}_engine.npy")
+    assert np.allclose(outputs["reference"], outputs["jit"], rtol=0, atol=1e-6)
+
+    # compiled (or plain python) loop and NumPy kernels
+    rng = np.random.default_rng(0)
+    filters = rng.standard_normal((4, 9))
+    stream = rng.standard_normal(8 + 50)
+    lower = rng.integers(0, 3, 50)
+    alphas = rng.random(50)
+    targets = np.sort(rng.integers(0, 20, 50))
+    out_loop, out_numpy = np.zeros(20), np.zeros(20)
+    ds._kernels.fir_accumulate_loop(stream, filters, lower, lower + 1, alphas, targets, out_loop)
+    ds._kernels.fir_accumulate(stream, filters, lower, lower + 1, alphas, targets, out_numpy)
+    assert np.allclose(out_loop, out_numpy)
+
+
+def test_simulation_delay_engine():
+    def render(engine, sources, chunk_size=4_096):
+        file_path = f"tests/_tmp/delay_{engine}_{len(sources)}_{chunk_size}.npy"
+        # the sources start late, so that the channel receives nothing from them at first
+        _scene(file_path, sources=[_sine_source(*source) for source in sources], engine=engine, chunk_size=chunk_size).run(progress=False)
+        return np.load(file_path)[:, 0]
+
+    first, second = (200, 10.0, 0.1), (310, -4.0, 0.3)
+    # a single source is filtered as by the reference engine, several sources are filtered independently
+    assert np.allclose(render("delay", [first]), render("reference", [first]), rtol=0, atol=1e-6)
+    mixed = render("delay", [first, second])
+    assert np.allclose(mixed, render("delay", [first]) + render("delay", [second]), rtol=0, atol=1e-6)
+    assert not np.allclose(render("reference", [first, second]), mixed, rtol=0, atol=1e-3)
+    assert np.allclose(render("delay", [first, second], chunk_size=7), mixed, rtol=0, atol=1e-6)
+
+
+def test_simulation_stems():
+    import shutil
+
+    cache_dir = os.path.join("tests", "_tmp", "stems")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def run(name, amplitude, stem_cache_dir=None, workers=1):
+        file_path = f"tests/_tmp/stems_{name}.npy"
+        sim = _scene(file_path, microphone=[[0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0], [0.1, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0]], microphone_path=_MOVING_PATH,
+                     sources=[_sine_source(200, 10.0), _sine_source(310, -4.0, amplitude=amplitude)], engine="delay", chunk_size=300, stem_cache_dir=stem_cache_dir)
+        sim.run(workers=workers, progress=False)
+        return sim, np.load(file_path)
+
+    # the mix of the stems is the output of the full render
+    _, direct = run("direct", 1.0)
+    sim, mixed = run("mixed", 1.0, cache_dir)
+    assert np.array_equal(mixed, direct)
+    stems = {name: os.stat(os.path.join(cache_dir, name)).st_mtime_ns for name in os.listdir(cache_dir)}
+    assert len(stems) == 2
+
+    # only the stem of the modified source is rendered again
+    _, direct = run("direct", 0.5)
+    _, mixed = run("mixed", 0.5, cache_dir)
+    assert np.array_equal(mixed, direct)
+    assert len(os.listdir(cache_dir)) == 3
+    assert sum(os.stat(os.path.join(cache_dir, name)).st_mtime_ns == mtime for name, mtime in stems.items()) == 2
+
+    shutil.rmtree(cache_dir)
+    _, parallel = run("parallel", 0.5, cache_dir, workers=2)
+    assert np.array_equal(parallel, direct)
+
+    # multitrack export
+    files = sim.export_stems(os.path.join("tests", "_tmp", "stems_export"))
+    assert [os.path.basename(file_path) for file_path in files[0]] == ["stems_mixed_source00.npy", "stems_mixed_source01.npy"]
+    assert np.allclose(sum(np.load(file_path) for file_path in files[0]), run("direct", 1.0)[1], rtol=0, atol=1e-6)
+
+    with pytest.raises(ValueError):
+        ds.Simulation(engine="reference", stem_cache_dir=cache_dir)
+    with pytest.raises(ValueError):
+        ds.Simulation(engine="delay").export_stems(cache_dir)
+
+
+def test_simulation_stream():
+    import asyncio
+
+    def build(engine):
+        return _scene(f"tests/_tmp/stream_{engine}.npy", microphone=ds.microphones.Hedraphone_v1, microphone_path=_MOVING_PATH, engine=engine, block_size=128, hop=32)
+
+    async def consume(stream):
+        return [block async for block in stream]
+
+    for engine in ("reference", "fft"):
+        sim = build(engine)
+        sim.run(progress=False)
+        expected = np.load(f"tests/_tmp/stream_{engine}.npy")
+        for prefetch in (0, 2):
+            blocks = list(sim.stream(microphone=np.int64(0), block_size=300, prefetch=prefetch))
+            assert [len(block) for block in blocks] == [300] * 6 + [200]
+            assert np.allclose(np.concatenate(blocks), expected, rtol=0, atol=1e-6)
+        other = build(engine)
+        stream = other.stream(microphone=other._microphones[0][1], block_size=512, prefetch=1)
+        assert np.allclose(np.concatenate(asyncio.run(consume(stream))), expected, rtol=0, atol=1e-6)
+        assert stream.position == stream.num_samples == 2_000
+
+    # a closed stream stops its producer and ends
+    with sim.stream(block_size=100, prefetch=2) as stream:
+        assert next(stream).shape == (100, 36)
+    assert not stream._thread.is_alive() and list(stream) == []
+    # so does a stream dropped without being closed
+    stream = sim.stream(block_size=100, prefetch=2)
+    next(stream)
+    thread = stream._thread
+    del stream
+    thread.join(timeout=5.0)
+    assert not thread.is_alive()
+    for microphone in (1, -1):
+        with pytest.raises(ValueError):
+            sim.stream(microphone=microphone)
+    with pytest.raises(ValueError):
+        sim.stream(block_size=0)
+
+
+def test_simulation_profile():
+    def build():
+        return _scene("tests/_tmp/profile.wav", sources=[_sine_source(100, 10.0)], sample_rate=1_000, chunk_size=256)
+
+    assert build().run(progress=False) is None
+
+    calls = []
+    profile = build().run(profile=True, progress=lambda microphone, done, total: calls.append((done, total)))
+    assert isinstance(profile, ds.Profile)
+    assert calls == [(256, 1_000), (512, 1_000), (768, 1_000), (1_000, 1_000)]
+    for stage in ("pose", "emission", "source", "filter", "output"):
+        assert profile.stages[stage]["calls"] > 0
+        assert profile.stages[stage]["time"] >= 0.0
+    assert profile.stages["pose"]["calls"] == 4
+    assert profile.peak_memory > 0
+    assert profile.wall_time >= sum(stage["time"] for name, stage in profile.stages.items() if name != "output")
+    assert "emission" in str(profile)
+
+
+def test_simulation_air_timeline():
+    def run(name, air_timeline, chunk_size=4_096):
+        np.random.seed(0)
+        source_path = [[-1.0, 100.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0], [1.0, 150.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0]]
+        _scene(f"tests/_tmp/air_{name}.npy", sources=[(source_path, ds.sources.WhiteNoise(duration=3.0, sample_rate=2_000))], chunk_size=chunk_size, air_timeline=air_timeline).run(progress=False)
+        return np.load(f"tests/_tmp/air_{name}.npy")
+
+    constant = run("constant", None)
+    assert np.allclose(run("flat", [[0.0, 20.0, 1.0, 50.0], [1.0, 20.0, 1.0, 50.0]]), constant, atol=1e-6)
+
+    timeline = [[0.0, 0.0, 1.0, 20.0], [1.0, 40.0, 0.95, 90.0]]
+    varying = run("varying", timeline)
+    assert not np.allclose(varying, constant, atol=1e-3)
+    assert np.array_equal(run("varying_chunks", timeline, chunk_size=333), varying)
+
+
+def test_simulation_chunks():
+    outputs = []
+    for engine, chunk_size in (("reference", 4_096), ("reference", 7), ("fft", 4_096), ("fft", 7)):
+        sim = ds.Simulation(temperature=20, pressure=1, relative_humidity=50, engine=engine, block_size=64, hop=16, chunk_size=chunk_size)
+        sim.add_microphone(path=ds.Path([
+                [0.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0],
+                [4.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0]
+            ]), microphone=ds.microphones.Hedraphone_v1(file_path=f"tests/_tmp/chunks_{engine}_{chunk_size}.wav", sample_rate=microphone_sample_rate)
+        )
+        sim.add_source(path=ds.Path([
+                [0.0, 3.0, 20.0, 1.0, 1.0, 0.0, 0.0, 0.0],
+                [4.0, 3.0, -20.0, 1.0, 1.0, 0.0, 0.0, 0.0]
+            ]), source=ds.sources.SineWave(frequency=20, amplitude=1.0)
+        )
+        sim.run()
+        outputs.append(_read_wav(f"tests/_tmp/chunks_{engine}_{chunk_size}.wav"))
+
+    assert outputs[0].shape == (400, 36)
+    assert np.array_equal(outputs[0], outputs[1])
+    assert np.allclose(outputs[2], outputs[3], atol=1e-9)
+
+
+def test_simulation_workers():
+    def simulation(name, engine):
+        return _scene(f"tests/_tmp/{name}_{engine}.wav", microphone=[
+                [0.0, 0.0, 0.0,        1.0, 0.0, 0.0, 0.0],
+                [0.1, 0.0, 0.0,        1.0, 0.0, 0.0, 0.0],
+                [0.0, 0.1, 0.0,        1.0, 0.0, 0.0, 0.0]
+            ], microphone_path=[
+                [0.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0],
+                [2.0, 1.0, 0.0, 1.0, 0.9, 0.1, 0.0, 0.2]
+            ], sources=[
+                ([[0.0, 3.0, 20.0, 1.0, 1.0, 0.0, 0.0, 0.0], [2.0, 3.0, -20.0, 1.0, 1.0, 0.0, 0.0, 0.0]], white_noise),
+                ([[0.5, 3.0, 2.0, -1.0, 1.0, 0.0, 0.0, 0.0], [2.0, 3.0, -2.0, -1.0, 1.0, 0.0, 0.0, 0.0]], ds.sources.SineWave(frequency=300, amplitude=1.0))
+            ], engine=engine, block_size=128, hop=32, chunk_size=256)
+
+    white_noise = ds.sources.WhiteNoise(duration=3.0, sample_rate=2_000, amplitude=1.0)
+    for engine in ("reference", "fft", "delay"):
+        simulation("workers_serial", engine).run()
+        for partition in ("microphone", "channel", "time"):
+            simulation(f"workers_{partition}", engine).run(workers=2, partition=partition)
+            assert filecmp.cmp(f"tests/_tmp/workers_serial_{engine}.wav", f"tests/_tmp/workers_{partition}_{engine}.wav", shallow=False)
+
+
+def test_simulation_workers_long_path():
+    # a source circling the microphone along 10k waypoints
+    times = np.linspace(0.0, 10.0, 10_001)
+    ones = np.ones_like(times)
+    source_path = np.column_stack([times, 5 * np.cos(times), 5 * np.sin(times), ones, ones, 0 * ones, 0 * ones, 0 * ones])
+    microphone_path = [[0.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0], [10.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0]]
+
+    def elapsed(name, **kwargs):
+        start = time.perf_counter()
+        _scene(f"tests/_tmp/long_path_{name}.wav", microphone_path=microphone_path, sources=[(source_path, ds.sources.SineWave(frequency=200, amplitude=1.0))],
+               sample_rate=1_000, chunk_size=64).run(progress=False, **kwargs)
+        return time.perf_counter() - start
+
+    elapsed("warmup")
+    serial = elapsed("serial")
+    parallel = elapsed("time", workers=2, partition="time")
+    assert filecmp.cmp("tests/_tmp/long_path_serial.wav", "tests/_tmp/long_path_time.wav", shallow=False)
+    # every tile starts in the middle of the path: the margin covers the pool and the warm-up of the tiles, not a
+    # linear search of the emission segment
+    assert parallel < 3 * serial
+
+
+def test_simulation_far_field():
+    def render(far_field, tolerance=0.05):
+        # a distant source, and one passing a few centimetres from the array
+        sim = _scene("tests/_tmp/far_field.wav", microphone=ds.microphones.Hedraphone_v2, microphone_path=[
+                [0.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0],
+                [1.0, 1.0, 0.0, 1.0, 0.9, 0.1, 0.0, 0.2]
+            ], sources=[
+                ([[-1.0, -30.0, 40.0, 10.0, 1.0, 0.0, 0.0, 0.0], [1.0, 30.0, 40.0, 10.0, 1.0, 0.0, 0.0, 0.0]], ds.sources.SineWave(frequency=200, amplitude=1.0)),
+                ([[0.0, 0.5, -1.0, 1.05, 1.0, 0.0, 0.0, 0.0], [1.0, 0.5, 1.0, 1.05, 1.0, 0.0, 0.0, 0.0]], ds.sources.SineWave(frequency=300, amplitude=0.1))
+            ], sample_rate=4_000, far_field=far_field, far_field_tolerance=tolerance)
+        microphone_path, microphone = sim._microphones[0]
+        renderer = ds._renderer.Renderer(sim, microphone_path, microphone, sim._solvers())
+        return np.concatenate(list(renderer.chunks())), renderer
+
+    exact, _ = render(False)
+    approximated, renderer = render(True)
+    assert np.abs(approximated - exact).max() < 1e-3 * np.abs(exact).max()
+    assert 0 < renderer.exact_samples < renderer.far_field_samples / 2
+    # without tolerance every sample falls back to the exact solve
+    strict, renderer = render(True, tolerance=0.0)
+    assert np.array_equal(strict, exact) and renderer.exact_samples == renderer.far_field_samples
+
+
 if __name__ == "__main__":
     test_simulation()
     test_simulation_2()
     test_simulation_3()
     test_simulation_4()
     test_path()
+    test_path_storage()
+    test_path_simplify()
+    test_path_positions()
+    test_microphone_world_poses()
+    test_simulation_fft_engine()
+    test_simulation_jit_engine()
+    test_simulation_delay_engine()
+    test_simulation_stems()
+    test_simulation_stream()
+    test_simulation_profile()
+    test_simulation_air_timeline()
+    test_simulation_chunks()
+    test_simulation_far_field()
+    test_simulation_workers()
+    test_simulation_workers_long_path()
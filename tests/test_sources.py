@@ -0,0 +1,141 @@
+import os
+import wave
+import numpy as np
+import dynamic_sound as ds
+
+tmp_path = os.path.join("tests", "_tmp")
+
+
+def _write_wav(file_path, signal, sample_rate):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with wave.open(file_path, mode="wb") as wave_file:
+        wave_file.setnchannels(1)
+        wave_file.setsampwidth(2)
+        wave_file.setframerate(sample_rate)
+        wave_file.writeframes((signal * np.iinfo(np.int16).max).astype("<i2").tobytes())
+
+
+class ConstantSource(ds.sources.Source):
+    def __init__(self, value):
+        super().__init__()
+        self.value = value
+
+    def get_sample(self, time:float):
+        return self.value
+
+
+def test_get_samples():
+    file_path = os.path.join(tmp_path, "noise.wav")
+    _write_wav(file_path, np.random.default_rng(0).uniform(-0.5, 0.5, 1_000), 1_000)
+
+    sources = [
+        ds.sources.SineWave(frequency=50, amplitude=0.5),
+        ds.sources.WhiteNoise(duration=2.0, sample_rate=1_000),
+        ds.sources.AudioFile(filename=file_path, loop=True),
+        ds.sources.AudioFile(filename=file_path, loop=False, gain_db=-6.0),
+        ConstantSource(0.25),
+    ]
+    times = np.linspace(0.0, 1.998, 777)
+    for source in sources:
+        samples = source.get_samples(times)
+        assert samples.shape == times.shape
+        assert np.allclose(samples, [source.get_sample(time) for time in times], atol=1e-6)
+
+
+def test_audio_file_stream():
+    import pickle
+    import soundfile
+
+    signal = np.random.default_rng(1).uniform(-0.5, 0.5, (3_000, 2))
+    times = np.linspace(0.0, 8.0, 1_001)
+    for file_name, subtype in (("stream.wav", "PCM_24"), ("stream.flac", "PCM_16")):
+        file_path = os.path.join(tmp_path, file_name)
+        soundfile.write(file_path, signal, 1_000, subtype=subtype)
+        for loop in (True, False):
+            decoded = ds.sources.AudioFile(filename=file_path, loop=loop, gain_db=-6.0)
+            streamed = ds.sources.AudioFile(filename=file_path, loop=loop, gain_db=-6.0, stream=True, window_size=256, max_windows=2)
+            assert streamed._signal is None
+            assert streamed.length == decoded.length and streamed.sample_rate == decoded.sample_rate
+            assert np.array_equal(streamed.get_samples(times), decoded.get_samples(times))
+            assert streamed.get_sample(1.2345) == decoded.get_sample(1.2345)
+            assert np.array_equal(pickle.loads(pickle.dumps(streamed)).get_samples(times), decoded.get_samples(times))
+        if file_name.endswith(".flac"):
+            assert len(streamed._reader._windows) <= 2
+
+
+def test_signal_cache():
+    import shutil
+
+    file_path = os.path.join(tmp_path, "cached.wav")
+    cache_dir = os.path.join(tmp_path, "signal_cache")
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    _write_wav(file_path, np.random.default_rng(2).uniform(-0.5, 0.5, 1_000), 1_000)
+
+    cache = ds.sources.signal_cache
+    cache.clear()
+    first = ds.sources.AudioFile(filename=file_path, sample_rate=800, gain_db=-6.0, cache_dir=cache_dir)
+    second = ds.sources.AudioFile(filename=file_path, sample_rate=800, gain_db=-6.0)
+    assert second._signal is first._signal and not first._signal.flags.writeable
+    other_gain = ds.sources.AudioFile(filename=file_path, sample_rate=800)
+    assert np.allclose(other_gain._signal * 10**(-6.0 / 20.0), first._signal)
+    assert cache.nbytes == first._signal.nbytes + other_gain._signal.nbytes
+
+    # the on-disk cache is read back by a fresh process cache, and dropped when the file changes
+    cache.clear()
+    assert len(os.listdir(cache_dir)) == 1
+    reloaded = ds.sources.AudioFile(filename=file_path, sample_rate=800, gain_db=-6.0, cache_dir=cache_dir)
+    assert np.array_equal(reloaded._signal, first._signal) and reloaded.sample_rate == 800
+    os.utime(file_path, ns=(0, 0))
+    ds.sources.AudioFile(filename=file_path, sample_rate=800, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == 2
+
+    # least recently used signals are dropped beyond the memory bound
+    cache.max_bytes = 2 * first._signal.nbytes
+    for sample_rate in (500, 600, 700):
+        ds.sources.AudioFile(filename=file_path, sample_rate=sample_rate)
+    assert cache.nbytes <= cache.max_bytes and len(cache._signals) == 2
+    cache.max_bytes = 1 << 30
+    cache.clear()
+
+
+def test_resampled_source():
+    file_path = os.path.join(tmp_path, "tone.wav")
+    tone = lambda frequency, times: 0.5 * np.sin(2 * np.pi * frequency * times)
+    _write_wav(file_path, tone(50.0, np.arange(1_000) / 1_000), 1_000)
+    times = np.random.default_rng(3).uniform(0.0, 3.0, 1_000)
+
+    # looping files are resampled as periodic signals
+    source = ds.sources.AudioFile(filename=file_path, loop=True)
+    resampled = source.prepare(44_100)
+    assert source.prepare(1_000) is source
+    assert resampled.sample_rate == 44_100 and resampled.loop
+    assert np.allclose(resampled.get_samples(times), tone(50.0, times), atol=1e-3)
+    assert resampled.get_sample(times[0]) == resampled.get_samples(times[:1])[0]
+    silent = ds.sources.AudioFile(filename=file_path, loop=False).prepare(3_000)
+    assert np.all(silent.get_samples(times[times >= 1.0]) == 0.0)
+
+    # content above the Nyquist frequency of the render rate is filtered out instead of aliased
+    _write_wav(file_path, tone(450.0, np.arange(2_000) / 1_000), 1_000)
+    source = ds.sources.AudioFile(filename=file_path, loop=True)
+    grid = np.arange(400, 800) / 400
+    assert np.std(source.get_samples(grid)) > 0.2
+    assert np.std(source.prepare(400).get_samples(grid)) < 0.01
+
+    # each source is prepared once per rate, the sources at the microphone rate are read as they are
+    noise = ds.sources.WhiteNoise(duration=2.0, sample_rate=1_000)
+    sim = ds.Simulation(source_oversampling=2)
+    path = ds.Path(np.array([[0.0, 0, 0, 0, 1, 0, 0, 0], [1.0, 0, 0, 0, 1, 0, 0, 0]]))
+    for added in (noise, noise, ds.sources.SineWave(frequency=10.0)):
+        sim.add_source(path=path, source=added)
+    first, second, sine = [source for _, source in sim._prepared_sources(500)]
+    assert first is second and first.sample_rate == 1_000 and sim._prepared_sources(500)[0][1] is first
+    assert sim._prepared_sources(400)[0][1].sample_rate == 800 and sine is sim._sources[2][1]
+    sim.source_oversampling = 3
+    assert sim._prepared_sources(500)[0][1].sample_rate == 1_500
+
+
+if __name__ == "__main__":
+    test_get_samples()
+    test_audio_file_stream()
+    test_signal_cache()
+    test_resampled_source()